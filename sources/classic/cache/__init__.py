@@ -1,4 +1,43 @@
-from . import caches, key_generators
+import importlib
+from typing import TYPE_CHECKING
+
 from .cache import Cache
 from .decorator import cached
 from .key_generator import FuncKeyCreator
+
+if TYPE_CHECKING:
+    from . import caches, key_generators
+    from .adaptive import AdaptiveState
+    from .bloom import BloomFilter, CountingBloomFilter
+    from .hot_keys import HotKeys
+
+# Подмодули и необязательные зависимости (redis, orjson) загружаются
+# лениво, при первом обращении к атрибуту пакета
+_LAZY_ATTRIBUTES = {
+    'caches': ('.caches', None),
+    'key_generators': ('.key_generators', None),
+    'AdaptiveState': ('.adaptive', 'AdaptiveState'),
+    'BloomFilter': ('.bloom', 'BloomFilter'),
+    'CountingBloomFilter': ('.bloom', 'CountingBloomFilter'),
+    'HotKeys': ('.hot_keys', 'HotKeys'),
+}
+
+
+def __getattr__(name: str):
+    try:
+        module_name, attribute = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+
+    value = importlib.import_module(module_name, __name__)
+    if attribute is not None:
+        value = getattr(value, attribute)
+
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY_ATTRIBUTES})
@@ -0,0 +1,172 @@
+from typing import Hashable
+
+
+class AdaptiveState:
+    """
+    Оценки стоимости кэширования функции для адаптивного режима
+    (`cached(adaptive=True)`).
+
+    Для каждой функции поддерживаются экспоненциально сглаженные оценки
+    стоимости обращения к кэшу (генерация ключа и чтение), стоимости промаха
+    (вычисление и запись), стоимости самого вычисления и доли попаданий.
+    Кэш используется, пока ожидаемая стоимость вызова с кэшем
+    `lookup_cost + (1 - hit_ratio) * miss_cost` не превышает стоимость
+    вызова в обход кэша: `compute_cost` плюс замеренные накладные расходы
+    самого обхода (`bypass_overhead`).
+    Иначе функция вызывается напрямую, а каждый `probe_interval`-й вызов
+    все равно проходит через кэш, чтобы обновить оценки стоимости
+    обращения к кэшу. Доля попаданий в обходе кэша оценивается не по этим
+    редким проверкам (их записи почти никогда не переиспользуются), а по
+    повторам ключей: хэш ключа каждого `reuse_interval`-го вызова
+    запоминается в двух поколениях по `reuse_window` хэшей, и вызов
+    считается попаданием, если его ключ встречался среди недавно
+    отобранных (для остальных вызовов ключ не строится вовсе, а
+    накладные расходы отбора распределяются на все вызовы в обход кэша).
+    Так кэширование
+    возобновляется, когда оно снова станет выгодным. Переключение
+    происходит с запасом `margin`, чтобы решение не "дребезжало" на
+    границе.
+
+    Оценки обновляются без блокировок: при конкурентных вызовах отдельные
+    замеры могут теряться, что для сглаженных оценок несущественно.
+    """
+
+    # Способы выполнения очередного вызова (см. `next_call`)
+    CACHE = 'cache'
+    BYPASS = 'bypass'
+    SAMPLE = 'sample'
+
+    def __init__(
+        self,
+        smoothing: float = 0.1,
+        min_samples: int = 20,
+        probe_interval: int = 100,
+        margin: float = 0.1,
+        reuse_window: int = 1024,
+        reuse_interval: int = 16,
+    ):
+        """
+        :param smoothing: вес нового замера в сглаженных оценках
+        :param min_samples: количество обращений к кэшу до первого решения
+        :param probe_interval: каждый какой вызов в обход кэша проходит
+         через кэш для обновления оценок
+        :param margin: относительный запас для смены решения
+        :param reuse_window: количество различных ключей в поколении, среди
+         которых ищутся повторы
+        :param reuse_interval: каждый какой вызов в обход кэша учитывается
+         в оценке повторов ключей
+        """
+        assert 0 < smoothing <= 1 and probe_interval > 0 and margin >= 0
+        assert reuse_interval > 0
+
+        self.smoothing = smoothing
+        self.min_samples = min_samples
+        self.probe_interval = probe_interval
+        self.margin = margin
+        self.reuse_window = reuse_window
+        self.reuse_interval = reuse_interval
+
+        self.caching = True
+        self.lookup_cost: float | None = None
+        self.miss_cost: float | None = None
+        self.compute_cost: float | None = None
+        self.bypass_overhead: float | None = None
+        self.hit_ratio: float | None = None
+        self.samples = 0
+        self.bypassed = 0
+        # Хэши ключей отобранных вызовов: текущее и предыдущее поколения
+        self._recent: set[int] = set()
+        self._previous: set[int] = set()
+
+    def _smooth(self, current: float | None, value: float) -> float:
+        if current is None:
+            return value
+        return current + self.smoothing * (value - current)
+
+    def next_call(self) -> str:
+        """
+        Решение для очередного вызова: через кэш (`CACHE`), в обход кэша
+        без замеров (`BYPASS`) или в обход кэша с замерами и учетом ключа
+        (`SAMPLE`)
+        """
+        if self.caching:
+            return self.CACHE
+
+        self.bypassed += 1
+        if self.bypassed % self.probe_interval == 0:
+            return self.CACHE
+        if self.bypassed % self.reuse_interval == 0:
+            return self.SAMPLE
+        return self.BYPASS
+
+    def record_lookup(self, cost: float, hit: bool) -> None:
+        """
+        Учитывает обращение к кэшу (генерация ключа и чтение)
+        """
+        self.lookup_cost = self._smooth(self.lookup_cost, cost)
+        if self.caching:
+            # Попадания проверок в обходе кэша не отражают повторы ключей
+            self.hit_ratio = self._smooth(self.hit_ratio, float(hit))
+        self.samples += 1
+        if hit:
+            self._decide()
+
+    def record_miss(self, cost: float) -> None:
+        """
+        Учитывает вычисление и запись результата при промахе
+        """
+        self.miss_cost = self._smooth(self.miss_cost, cost)
+        self._decide()
+
+    def record_compute(self, cost: float) -> None:
+        """
+        Учитывает вычисление функции (без записи в кэш)
+        """
+        self.compute_cost = self._smooth(self.compute_cost, cost)
+
+    def record_reuse(self, key: Hashable) -> None:
+        """
+        Учитывает ключ отобранного вызова в обход кэша
+        """
+        key_hash = hash(key)
+        reused = key_hash in self._recent or key_hash in self._previous
+        self._recent.add(key_hash)
+        if len(self._recent) >= self.reuse_window:
+            self._previous, self._recent = self._recent, set()
+        self.hit_ratio = self._smooth(self.hit_ratio, float(reused))
+
+    def record_bypass(self, cost: float, overhead: float) -> None:
+        """
+        Учитывает отобранный вызов в обход кэша: вычисление и накладные
+        расходы обхода в расчете на один вызов
+        """
+        self.compute_cost = self._smooth(self.compute_cost, cost)
+        self.bypass_overhead = self._smooth(self.bypass_overhead, overhead)
+
+    @property
+    def cached_cost(self) -> float | None:
+        """
+        Ожидаемая стоимость вызова с кэшем
+        """
+        if self.lookup_cost is None or self.miss_cost is None:
+            return None
+        return self.lookup_cost + (1 - self.hit_ratio) * self.miss_cost
+
+    def _decide(self) -> None:
+        cached_cost = self.cached_cost
+        if cached_cost is None or self.samples < self.min_samples:
+            return
+
+        # Если вычисление отдельно не замерялось (промахи под арендой),
+        # его стоимость оценивается сверху стоимостью промаха
+        compute_cost = self.compute_cost
+        if compute_cost is None:
+            compute_cost = self.miss_cost
+        # Обход кэша тоже не бесплатен
+        if self.bypass_overhead is not None:
+            compute_cost += self.bypass_overhead
+
+        if self.caching:
+            self.caching = cached_cost <= compute_cost * (1 + self.margin)
+        else:
+            self.caching = cached_cost < compute_cost * (1 - self.margin)
@@ -0,0 +1,146 @@
+import math
+import threading
+from hashlib import blake2b
+from typing import Iterable
+
+
+class BloomFilter:
+    """
+    Фильтр Блума: компактное вероятностное множество байтовых ключей.
+    Отвечает "точно отсутствует" без ложноотрицательных срабатываний
+    и "возможно присутствует" с заданной вероятностью ложноположительных.
+    """
+
+    BITS_PER_CELL = 1
+
+    def __init__(
+        self,
+        capacity: int,
+        error_rate: float = 0.01,
+        max_bytes: int | None = None,
+    ):
+        """
+        :param capacity: ожидаемое количество элементов
+        :param error_rate: допустимая вероятность ложноположительного ответа
+         при заполнении до `capacity`
+        :param max_bytes: ограничение памяти под фильтр (при его достижении
+         вероятность ложноположительных ответов будет выше `error_rate`)
+        """
+        assert capacity > 0 and 0 < error_rate < 1
+
+        size = math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2)
+        if max_bytes is not None:
+            size = min(size, max_bytes * 8 // self.BITS_PER_CELL)
+
+        self.size = max(size, 8)
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._cells = self._new_cells()
+        self._lock = threading.Lock()
+        self._rebuild_lock = threading.Lock()
+        # Позиции элементов, добавленных во время перестроения
+        self._added: list[list[int]] | None = None
+
+    def _new_cells(self) -> bytearray:
+        return bytearray(math.ceil(self.size * self.BITS_PER_CELL / 8))
+
+    def _positions(self, item: bytes) -> list[int]:
+        # Двойное хэширование: k позиций из двух независимых 64-битных хэшей
+        digest = blake2b(item, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return [
+            (first + index * second) % self.size
+            for index in range(self.hashes)
+        ]
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Объем памяти, занимаемый данными фильтра, в байтах
+        """
+        return len(self._cells)
+
+    @staticmethod
+    def _mark(cells: bytearray, positions: list[int]) -> None:
+        for position in positions:
+            cells[position >> 3] |= 1 << (position & 7)
+
+    def add(self, item: bytes) -> None:
+        positions = self._positions(item)
+        with self._lock:
+            self._mark(self._cells, positions)
+            if self._added is not None:
+                self._added.append(positions)
+
+    def remove(self, item: bytes) -> None:
+        """
+        Обычный фильтр Блума не поддерживает удаление: элемент продолжает
+        считаться "возможно присутствующим", что безопасно для кэша
+        """
+
+    def __contains__(self, item: bytes) -> bool:
+        cells = self._cells
+        return all(
+            cells[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+    def clear(self) -> None:
+        with self._lock:
+            self._cells = self._new_cells()
+
+    def rebuild(self, items: Iterable[bytes]) -> None:
+        """
+        Перестраивает фильтр по актуальному набору элементов. Новые данные
+        заполняются отдельно и подменяют текущие целиком, поэтому во время
+        перестроения фильтр продолжает отвечать по старым данным. Элементы,
+        добавленные во время перестроения, переносятся в новые данные.
+        """
+        with self._rebuild_lock:
+            with self._lock:
+                self._added = []
+            try:
+                cells = self._new_cells()
+                for item in items:
+                    self._mark(cells, self._positions(item))
+
+                with self._lock:
+                    for positions in self._added:
+                        self._mark(cells, positions)
+                    self._cells = cells
+            finally:
+                with self._lock:
+                    self._added = None
+
+
+class CountingBloomFilter(BloomFilter):
+    """
+    Считающий фильтр Блума: вместо битов хранит 8-битные счетчики и
+    поддерживает удаление элементов (ценой 8-кратного расхода памяти).
+    Насыщенные счетчики не уменьшаются, чтобы не терять другие элементы.
+    """
+
+    BITS_PER_CELL = 8
+    MAX_COUNTER = 255
+
+    @classmethod
+    def _mark(cls, cells: bytearray, positions: list[int]) -> None:
+        for position in positions:
+            if cells[position] < cls.MAX_COUNTER:
+                cells[position] += 1
+
+    def remove(self, item: bytes) -> None:
+        positions = self._positions(item)
+        with self._lock:
+            cells = self._cells
+            # Удаляем только то, что могло быть добавлено: иначе уменьшение
+            # счетчиков приведет к ложноотрицательным ответам для соседей
+            if not all(cells[position] for position in positions):
+                return
+            for position in positions:
+                if cells[position] < self.MAX_COUNTER:
+                    cells[position] -= 1
+
+    def __contains__(self, item: bytes) -> bool:
+        cells = self._cells
+        return all(cells[position] for position in self._positions(item))
@@ -1,5 +1,6 @@
 from abc import ABC, abstractmethod
-from typing import Mapping, Any, Hashable, TypeVar, Type
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Mapping, Any, Hashable, TypeVar, Type
 
 import msgspec
 
@@ -8,6 +9,37 @@ from .key_generator import FuncKeyCreator
 Key = TypeVar('Key', bound=Hashable)
 Value = TypeVar('Value', bound=object)
 Result = tuple[Value, bool]
+Progress = Callable[[int], bool | None]
+
+
+@dataclass
+class Footprint:
+    """
+    Занимаемая элементами кэша память.
+
+    Атрибуты:
+    entries (int): Количество элементов.
+    bytes (int): Размер элементов в байтах.
+    expired (int): Количество истекших, но еще не удаленных элементов.
+    """
+    entries: int = 0
+    bytes: int = 0
+    expired: int = 0
+
+
+@dataclass
+class MemoryReport:
+    """
+    Отчет о занимаемой кэшем памяти.
+
+    Атрибуты:
+    functions (dict[str, Footprint]): Память по префиксам функций
+    `module->qualname` (пустой префикс - ключи вне функций).
+    largest (list[tuple[Key, int]]): Самые крупные элементы и их размеры
+    в байтах по убыванию.
+    """
+    functions: dict[str, Footprint] = field(default_factory=dict)
+    largest: list[tuple[Hashable, int]] = field(default_factory=list)
 
 
 class Cache(ABC):
@@ -78,6 +110,14 @@ class Cache(ABC):
         """
         ...
 
+    def exists_many(self, keys: Iterable[Key]) -> Mapping[Key, bool]:
+        """
+        Проверяет существование нескольких элементов в кэше.
+        :param keys: Ключи, по которым осуществляется доступ к элементам.
+        :return: Словарь с признаком существования для каждого ключа.
+        """
+        return {key: self.exists(key) for key in keys}
+
     @abstractmethod
     def get(self, key: Key, cast_to: Type[Value]) -> Result:
         """
@@ -114,3 +154,83 @@ class Cache(ABC):
         Удаляет все элементы из кэша.
         """
         ...
+
+    def touch(self, key: Key, ttl: int) -> None:
+        """
+        Продлевает время жизни элемента (скользящее истечение).
+        :param key: Ключ, по которому осуществляется доступ к элементу.
+        :param ttl: Новое время жизни элемента в секундах, отсчитываемое от
+         текущего момента.
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support sliding expiration'
+        )
+
+    def get_and_touch(
+        self,
+        key: Key,
+        cast_to: Type[Value],
+        ttl: int,
+    ) -> Result:
+        """
+        Получает элемент из кэша и при попадании продлевает его время жизни
+        на `ttl` секунд от текущего момента.
+        :param key: Ключ, по которому осуществляется доступ к элементу.
+        :param cast_to: Тип, к которому следует привести элемент.
+        :param ttl: Новое время жизни элемента в секундах.
+        :return: Кортеж из элемента и флага его наличия в кэше.
+        """
+        value, found = self.get(key, cast_to)
+        if found:
+            self.touch(key, ttl)
+        return value, found
+
+    def invalidate_prefix(
+        self,
+        prefix: str | bytes,
+        batch_size: int = 1000,
+        progress: Progress | None = None,
+    ) -> int:
+        """
+        Удаляет из кэша все элементы, строковые (байтовые) ключи которых
+        начинаются с `prefix`, порциями по `batch_size`.
+        :param prefix: Префикс ключей, например `module->qualname:`.
+        :param batch_size: Размер порции удаляемых ключей.
+        :param progress: Вызывается после каждой порции с общим числом
+         удаленных ключей. Если вернет False, удаление прерывается.
+        :return: Количество удаленных ключей.
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support prefix invalidation'
+        )
+
+    def memory_report(self, top: int = 10) -> MemoryReport:
+        """
+        Отчет о занимаемой памяти по функциям, чьи результаты хранятся в
+        кэше, и о самых крупных элементах.
+        :param top: Количество самых крупных элементов в отчете.
+        :return: Отчет о занимаемой памяти.
+        """
+        raise NotImplementedError(
+            f'{type(self).__name__} does not support memory introspection'
+        )
+
+    def acquire_lease(self, key: Key, ttl: float) -> Hashable | None:
+        """
+        Пытается захватить аренду (lease) на вычисление значения по ключу,
+        чтобы только один вызывающий вычислял отсутствующий в кэше элемент.
+        Базовая реализация не поддерживает распределенные аренды и всегда
+        разрешает вычисление.
+        :param key: Ключ, по которому осуществляется доступ к элементу.
+        :param ttl: Время жизни аренды в секундах. По его истечении аренда
+         освобождается автоматически (защита от "упавшего" владельца).
+        :return: Токен аренды, если она захвачена, иначе None.
+        """
+        return True
+
+    def release_lease(self, key: Key, token: Hashable) -> None:
+        """
+        Освобождает аренду, захваченную через `acquire_lease`.
+        :param key: Ключ, по которому осуществляется доступ к элементу.
+        :param token: Токен, полученный при захвате аренды.
+        """
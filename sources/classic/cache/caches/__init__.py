@@ -1,2 +1,39 @@
-from .redis import RedisCache
-from .in_memory import InMemoryCache
+import importlib
+from typing import TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from .redis import RedisCache
+    from .in_memory import InMemoryCache
+    from .eviction import EvictionPolicy, LRU, WTinyLFU
+    from .guarded import CircuitBreaker, GuardedCache
+
+# Реализации загружаются лениво: например, redis импортируется только при
+# обращении к RedisCache
+_LAZY_ATTRIBUTES = {
+    'RedisCache': '.redis',
+    'InMemoryCache': '.in_memory',
+    'EvictionPolicy': '.eviction',
+    'LRU': '.eviction',
+    'WTinyLFU': '.eviction',
+    'CircuitBreaker': '.guarded',
+    'GuardedCache': '.guarded',
+}
+
+__all__ = tuple(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY_ATTRIBUTES})
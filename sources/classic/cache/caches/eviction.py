@@ -0,0 +1,157 @@
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+
+from ..cache import Key
+from ..sketch import CountMinSketch
+
+
+class EvictionPolicy(ABC):
+    """
+    Политика вытеснения для ограниченного по размеру InMemoryCache.
+    Отслеживает только ключи, сами значения хранит кэш.
+    """
+
+    def __init__(self, max_size: int):
+        """
+        :param max_size: максимальное количество элементов в кэше
+        """
+        assert max_size > 0
+        self.max_size = max_size
+
+    @abstractmethod
+    def access(self, key: Key) -> None:
+        """
+        Учитывает обращение к элементу, находящемуся в кэше
+        """
+        ...
+
+    @abstractmethod
+    def insert(self, key: Key) -> list[Key]:
+        """
+        Учитывает добавление нового элемента.
+        :return: ключи, которые нужно вытеснить из кэша (среди них может
+         оказаться и сам добавляемый ключ, если политика его не допустила)
+        """
+        ...
+
+    @abstractmethod
+    def remove(self, key: Key) -> None:
+        """
+        Учитывает удаление элемента из кэша
+        """
+        ...
+
+    @abstractmethod
+    def clear(self) -> None:
+        ...
+
+
+class LRU(EvictionPolicy):
+    """
+    Вытеснение давно не использованных элементов (least recently used)
+    """
+
+    def __init__(self, max_size: int):
+        super().__init__(max_size)
+        self._order = OrderedDict()
+
+    def access(self, key: Key) -> None:
+        if key in self._order:
+            self._order.move_to_end(key)
+
+    def insert(self, key: Key) -> list[Key]:
+        self._order[key] = None
+        if len(self._order) <= self.max_size:
+            return []
+
+        victim, __ = self._order.popitem(last=False)
+        return [victim]
+
+    def remove(self, key: Key) -> None:
+        self._order.pop(key, None)
+
+    def clear(self) -> None:
+        self._order.clear()
+
+
+class WTinyLFU(EvictionPolicy):
+    """
+    Window-TinyLFU: новые элементы попадают в небольшое LRU-окно, а
+    вытесненный из окна кандидат допускается в основную область (SLRU из
+    испытательного и защищенного сегментов), только если по оценке
+    count-min sketch он встречается чаще, чем жертва из основной области.
+    Однократные обращения (сканирования) не вытесняют часто используемые
+    элементы. Все операции - O(1).
+    """
+
+    def __init__(
+        self,
+        max_size: int,
+        window_ratio: float = 0.01,
+        protected_ratio: float = 0.8,
+    ):
+        """
+        :param max_size: максимальное количество элементов в кэше
+        :param window_ratio: доля окна для новых элементов
+        :param protected_ratio: доля защищенного сегмента в основной области
+        """
+        super().__init__(max_size)
+        self.window_size = max(1, int(max_size * window_ratio))
+        self.main_size = max_size - self.window_size
+        self.protected_size = int(self.main_size * protected_ratio)
+
+        self.sketch = CountMinSketch(max_size)
+        self._window = OrderedDict()
+        self._probation = OrderedDict()
+        self._protected = OrderedDict()
+
+    def access(self, key: Key) -> None:
+        self.sketch.increment(key)
+
+        if key in self._window:
+            self._window.move_to_end(key)
+        elif key in self._protected:
+            self._protected.move_to_end(key)
+        elif key in self._probation:
+            # Повторное обращение переводит элемент в защищенный сегмент
+            del self._probation[key]
+            self._protected[key] = None
+            if len(self._protected) > self.protected_size:
+                demoted, __ = self._protected.popitem(last=False)
+                self._probation[demoted] = None
+
+    def insert(self, key: Key) -> list[Key]:
+        self.sketch.increment(key)
+
+        self._window[key] = None
+        if len(self._window) <= self.window_size:
+            return []
+
+        candidate, __ = self._window.popitem(last=False)
+        if len(self._probation) + len(self._protected) < self.main_size:
+            self._probation[candidate] = None
+            return []
+
+        victims = self._probation or self._protected
+        if not victims:
+            return [candidate]
+
+        victim = next(iter(victims))
+
+        if self.sketch.estimate(candidate) > self.sketch.estimate(victim):
+            del victims[victim]
+            self._probation[candidate] = None
+            return [victim]
+
+        return [candidate]
+
+    def remove(self, key: Key) -> None:
+        for segment in (self._window, self._probation, self._protected):
+            if segment.pop(key, 0) is None:
+                return
+
+    def clear(self) -> None:
+        self.sketch.clear()
+        self._window.clear()
+        self._probation.clear()
+        self._protected.clear()
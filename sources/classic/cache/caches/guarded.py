@@ -0,0 +1,331 @@
+import functools
+import threading
+import time
+from collections import deque
+from concurrent import futures
+from dataclasses import field
+from typing import Any, Callable, Hashable, Iterable, Mapping, Type
+
+try:
+    from redis import RedisError
+except ImportError:
+    RedisError = OSError
+
+from classic.components import component
+
+from ..cache import Cache, Key, MemoryReport, Progress, Result, Value
+from ..key_generator import FuncKeyCreator
+
+# Ошибки, которые считаются отказом кэша, а не ошибкой в вызывающем коде
+CACHE_ERRORS = (RedisError, OSError, TimeoutError, futures.TimeoutError)
+
+
+class CircuitBreaker:
+    """
+    Автоматический выключатель: после `failure_threshold` отказов или
+    медленных вызовов подряд размыкается и не пропускает вызовы
+    `recovery_timeout` секунд, затем пропускает пробные вызовы
+    (полуоткрытое состояние) и замыкается после первого успешного.
+    """
+
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(
+        self,
+        failure_threshold: int = 5,
+        slow_call_threshold: float | None = None,
+        recovery_timeout: float = 5.0,
+        half_open_probes: int = 1,
+    ):
+        """
+        :param failure_threshold: число отказов подряд для размыкания
+        :param slow_call_threshold: длительность вызова в секундах, начиная
+         с которой он считается отказом (None - не учитывать длительность)
+        :param recovery_timeout: время в секундах до пробных вызовов
+        :param half_open_probes: число одновременных пробных вызовов
+        """
+        self.failure_threshold = failure_threshold
+        self.slow_call_threshold = slow_call_threshold
+        self.recovery_timeout = recovery_timeout
+        self.half_open_probes = half_open_probes
+
+        self._state = self.CLOSED
+        self._failures = 0
+        self._opened_at = 0.0
+        self._probes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def state(self) -> str:
+        with self._lock:
+            if (
+                self._state == self.OPEN
+                and time.monotonic() - self._opened_at >= self.recovery_timeout
+            ):
+                return self.HALF_OPEN
+            return self._state
+
+    def allow(self) -> bool:
+        """
+        Разрешает ли выключатель очередной вызов
+        """
+        if self._state == self.CLOSED:
+            return True
+
+        with self._lock:
+            if self._state == self.OPEN:
+                if time.monotonic() - self._opened_at < self.recovery_timeout:
+                    return False
+                self._state = self.HALF_OPEN
+                self._probes = 0
+
+            if self._state == self.HALF_OPEN:
+                if self._probes >= self.half_open_probes:
+                    return False
+                self._probes += 1
+
+            return True
+
+    def record_success(self, elapsed: float) -> None:
+        """
+        Учитывает завершившийся вызов длительностью `elapsed` секунд
+        """
+        if (
+            self.slow_call_threshold is not None
+            and elapsed >= self.slow_call_threshold
+        ):
+            self.record_failure()
+            return
+
+        with self._lock:
+            self._failures = 0
+            self._state = self.CLOSED
+
+    def record_failure(self) -> None:
+        """
+        Учитывает отказ кэша
+        """
+        with self._lock:
+            self._failures += 1
+            if (
+                self._state == self.HALF_OPEN
+                or self._failures >= self.failure_threshold
+            ):
+                self._state = self.OPEN
+                self._opened_at = time.monotonic()
+                self._failures = 0
+
+
+@component
+class GuardedCache(Cache):
+    """
+    Защитная обертка над медленным или недоступным кэшем (например,
+    RedisCache): ограничивает время каждой операции, а при отказах
+    размыкает `breaker`. Пока он разомкнут, чтения считаются промахами,
+    записи отбрасываются, а инвалидации копятся в очереди и выполняются
+    после восстановления. Если в очереди больше
+    `max_pending_invalidations` инвалидаций, она заменяется одной
+    `invalidate_all`, чтобы не потерять ни одну из них.
+    """
+    cache: Cache
+    key_function: FuncKeyCreator | None = None
+    breaker: CircuitBreaker = field(default_factory=CircuitBreaker)
+    timeout: float | None = None
+    max_workers: int = 8
+    max_pending_invalidations: int = 10000
+    errors: tuple[Type[BaseException], ...] = CACHE_ERRORS
+
+    def __post_init__(self):
+        if self.key_function is None:
+            self.key_function = self.cache.key_function
+
+        # Операции с дедлайном выполняются в пуле потоков: зависший вызов
+        # продолжит работу в фоне, но вызывающий дождется не более `timeout`
+        self._executor = None
+        if self.timeout is not None:
+            self._executor = futures.ThreadPoolExecutor(
+                self.max_workers, thread_name_prefix='GuardedCache'
+            )
+        self._pending = deque()
+        self._pending_prefixes = deque()
+        self._pending_all = False
+
+    def _call(self, fallback: Any, operation: Callable, *args) -> Any:
+        """
+        Выполняет операцию кэша с учетом дедлайна и состояния выключателя.
+        :param fallback: результат при разомкнутом выключателе или отказе
+        :param operation: операция кэша
+        :return: результат операции или `fallback`
+        """
+        if not self.breaker.allow():
+            return fallback
+
+        started = time.monotonic()
+        try:
+            if self._executor is None:
+                result = operation(*args)
+            else:
+                result = self._executor.submit(operation, *args).result(
+                    self.timeout
+                )
+        except self.errors:
+            self.breaker.record_failure()
+            return fallback
+        except BaseException:
+            # Кэш ответил, ошибка на нашей стороне (например, тип значения)
+            self.breaker.record_success(time.monotonic() - started)
+            raise
+
+        self.breaker.record_success(time.monotonic() - started)
+        return result
+
+    def _guarded(self, fallback: Any, operation: Callable, *args) -> Any:
+        # Накопленные инвалидации выполняются до самой операции, чтобы после
+        # восстановления кэша не прочитать устаревшее значение
+        if (
+            self._pending or self._pending_prefixes or self._pending_all
+        ) and not self._flush_pending():
+            return fallback
+
+        return self._call(fallback, operation, *args)
+
+    def _defer(self, queue: deque, item: Key | str | bytes) -> None:
+        """
+        Откладывает инвалидацию до восстановления кэша. При переполнении
+        очереди откладывается полная очистка кэша.
+        """
+        if self._pending_all:
+            return
+
+        queue.append(item)
+        pending = len(self._pending) + len(self._pending_prefixes)
+        if pending > self.max_pending_invalidations:
+            self._defer_all()
+
+    def _defer_all(self) -> None:
+        self._pending_all = True
+        self._pending.clear()
+        self._pending_prefixes.clear()
+
+    def _flush_pending(self) -> bool:
+        """
+        Выполняет инвалидации, накопленные за время отказа кэша.
+        :return: True, если все инвалидации выполнены
+        """
+        failed = object()
+
+        if self._pending_all:
+            self._pending_all = False
+            self._pending.clear()
+            self._pending_prefixes.clear()
+            if self._call(failed, self.cache.invalidate_all) is failed:
+                self._pending_all = True
+                return False
+
+        while self._pending_prefixes:
+            try:
+                prefix = self._pending_prefixes.popleft()
+            except IndexError:
+                break
+            invalidated = self._call(
+                failed, self.cache.invalidate_prefix, prefix
+            )
+            if invalidated is failed:
+                self._pending_prefixes.appendleft(prefix)
+                return False
+
+        while self._pending:
+            try:
+                key = self._pending.popleft()
+            except IndexError:
+                break
+            if self._call(failed, self.cache.invalidate, key) is failed:
+                self._pending.appendleft(key)
+                return False
+
+        return True
+
+    def set(
+        self,
+        key: Key,
+        value: Value,
+        ttl: int | None = None,
+    ) -> None:
+        self._guarded(None, self.cache.set, key, value, ttl)
+
+    def set_many(
+        self,
+        elements: Mapping[Key, Value],
+        ttl: int | None = None
+    ) -> None:
+        self._guarded(None, self.cache.set_many, elements, ttl)
+
+    def exists(self, key: Key) -> bool:
+        return self._guarded(False, self.cache.exists, key)
+
+    def exists_many(self, keys: Iterable[Key]) -> Mapping[Key, bool]:
+        keys = list(keys)
+        fallback = dict.fromkeys(keys, False)
+        return self._guarded(fallback, self.cache.exists_many, keys)
+
+    def get(self, key: Key, cast_to: Type[Value]) -> Result:
+        return self._guarded((None, False), self.cache.get, key, cast_to)
+
+    def get_and_touch(
+        self,
+        key: Key,
+        cast_to: Type[Value],
+        ttl: int,
+    ) -> Result:
+        return self._guarded(
+            (None, False), self.cache.get_and_touch, key, cast_to, ttl
+        )
+
+    def touch(self, key: Key, ttl: int) -> None:
+        self._guarded(None, self.cache.touch, key, ttl)
+
+    def get_many(self, keys: dict[Key, Type[Value]]) -> Mapping[Key, Result]:
+        fallback = {key: (None, False) for key in keys}
+        return self._guarded(fallback, self.cache.get_many, keys)
+
+    def invalidate(self, key: Key) -> None:
+        failed = object()
+        if self._guarded(failed, self.cache.invalidate, key) is failed:
+            self._defer(self._pending, key)
+
+    def invalidate_all(self) -> None:
+        failed = object()
+        if self._guarded(failed, self.cache.invalidate_all) is failed:
+            self._defer_all()
+
+    def invalidate_prefix(
+        self,
+        prefix: str | bytes,
+        batch_size: int = 1000,
+        progress: Progress | None = None,
+    ) -> int:
+        failed = object()
+        deleted = self._guarded(
+            failed, self.cache.invalidate_prefix, prefix, batch_size, progress
+        )
+        if deleted is failed:
+            self._defer(self._pending_prefixes, prefix)
+            return 0
+        return deleted
+
+    def memory_report(self, top: int = 10, **kwargs) -> MemoryReport:
+        # Параметры конкретной реализации (например, `sample_size` у
+        # RedisCache) передаются как есть
+        return self._guarded(
+            MemoryReport(),
+            functools.partial(self.cache.memory_report, top, **kwargs),
+        )
+
+    def acquire_lease(self, key: Key, ttl: float) -> Hashable | None:
+        # Без работающего кэша координировать вычисление не с кем
+        return self._guarded(True, self.cache.acquire_lease, key, ttl)
+
+    def release_lease(self, key: Key, token: Hashable) -> None:
+        self._guarded(None, self.cache.release_lease, key, token)
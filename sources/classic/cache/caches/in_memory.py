@@ -1,3 +1,5 @@
+import heapq
+import threading
 import time
 from dataclasses import field
 
@@ -5,14 +7,82 @@ from typing import Mapping, Type
 
 from classic.components import component
 
-from ..cache import Cache, Key, Value, Result
-from ..key_generators import PureHash
+from ..cache import (
+    Cache, Footprint, Key, MemoryReport, Progress, Result, Value,
+)
+from ..key_generators.pure_hash import PureHash
+from .eviction import EvictionPolicy
 
 
 @component
 class InMemoryCache(Cache):
+    """
+    Кэширование в памяти процесса. При заданной политике `eviction`
+    (например, `LRU` или `WTinyLFU`) количество элементов ограничено ее
+    `max_size`, иначе кэш не ограничен.
+
+    Количество и размер элементов по функциям учитываются при каждой
+    записи и удалении (под той же блокировкой, что и изменение кэша),
+    поэтому `memory_report` обходит кэш только ради истекших элементов и
+    самых крупных ключей.
+    """
     key_function = field(default_factory=PureHash)
     cache: dict[Key, tuple[int | None, bytes]] = field(default_factory=dict)
+    eviction: EvictionPolicy | None = None
+
+    def __post_init__(self):
+        self._lock = threading.Lock()
+        self._footprints: dict[str, Footprint] = {}
+        for key, cached_value in self.cache.items():
+            self._account(key, cached_value, 1)
+
+    def _account(
+        self,
+        key: Key,
+        cached_value: tuple[int | None, bytes],
+        sign: int,
+    ) -> None:
+        """
+        Учитывает появление (`sign=1`) или удаление (`sign=-1`) элемента в
+        счетчиках его функции (под блокировкой)
+        """
+        prefix = self.key_function.function_prefix(key)
+        footprint = self._footprints.get(prefix)
+        if footprint is None:
+            footprint = self._footprints[prefix] = Footprint()
+
+        footprint.entries += sign
+        footprint.bytes += sign * len(cached_value[1])
+        if not footprint.entries:
+            del self._footprints[prefix]
+
+    def _put(self, key: Key, cached_value: tuple[int | None, bytes]) -> None:
+        """
+        Запись элемента с учетом занимаемой памяти (под блокировкой)
+        """
+        previous = self.cache.get(key)
+        self.cache[key] = cached_value
+        if previous is not None:
+            self._account(key, previous, -1)
+        self._account(key, cached_value, 1)
+
+    def _discard(self, key: Key) -> None:
+        """
+        Удаление элемента с учетом занимаемой памяти (под блокировкой)
+        """
+        previous = self.cache.pop(key, None)
+        if previous is not None:
+            self._account(key, previous, -1)
+
+    def __getstate__(self) -> dict:
+        # Блокировка не сериализуется и не копируется: у копии она своя
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state: dict) -> None:
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
 
     def set(
         self,
@@ -20,9 +90,21 @@ class InMemoryCache(Cache):
         value: Value,
         ttl: int | None = None,
     ) -> None:
-        self.cache[key] =(
+        cached_value = (
             time.monotonic() + ttl if ttl else None, self._serialize(value)
         )
+        with self._lock:
+            if self.eviction is None:
+                evicted = ()
+            elif key in self.cache:
+                self.eviction.access(key)
+                evicted = ()
+            else:
+                evicted = self.eviction.insert(key)
+
+            self._put(key, cached_value)
+            for evicted_key in evicted:
+                self._discard(evicted_key)
 
     def set_many(
         self,
@@ -47,15 +129,131 @@ class InMemoryCache(Cache):
             return None, False
 
         if expiry is not None and time.monotonic() >= expiry:
+            if self.eviction is not None:
+                # Истекший элемент не должен занимать место в кэше
+                self.invalidate(key)
             return None, False
 
+        if self.eviction is not None:
+            with self._lock:
+                self.eviction.access(key)
+
         return self._deserialize(cached_value, cast_to), True
 
+    def _extend(
+        self,
+        key: Key,
+        cached_value: tuple[int | None, bytes],
+        ttl: int,
+    ) -> None:
+        """
+        Замена срока годности элемента без повторной сериализации
+        """
+        extended = (time.monotonic() + ttl, cached_value[1])
+
+        # Элемент мог быть перезаписан, вытеснен или удален после чтения:
+        # продлеваем только прочитанную запись, не возвращая прежнее значение
+        # (все изменения кэша выполняются под этой же блокировкой)
+        with self._lock:
+            if self.cache.get(key) is cached_value:
+                self.cache[key] = extended
+
+    def touch(self, key: Key, ttl: int) -> None:
+        cached_value = self.cache.get(key)
+        if cached_value is None:
+            return
+
+        # Как и EXPIRE в Redis, истекший элемент не продлевается
+        expiry = cached_value[0]
+        if expiry is None or time.monotonic() < expiry:
+            self._extend(key, cached_value, ttl)
+
+    def get_and_touch(
+        self,
+        key: Key,
+        cast_to: Type[Value],
+        ttl: int,
+    ) -> Result:
+        try:
+            cached_value = self.cache[key]
+        except KeyError:
+            return None, False
+
+        expiry, value = cached_value
+        if expiry is not None and time.monotonic() >= expiry:
+            if self.eviction is not None:
+                self.invalidate(key)
+            return None, False
+
+        self._extend(key, cached_value, ttl)
+        if self.eviction is not None:
+            with self._lock:
+                self.eviction.access(key)
+
+        return self._deserialize(value, cast_to), True
+
     def get_many(self, keys: dict[Key, Type[Value]]) -> Mapping[Key, Result]:
         return {key: self.get(key, cast_to) for key, cast_to in keys.items()}
 
     def invalidate(self, key: Key) -> None:
-        self.cache.pop(key, None)
+        with self._lock:
+            self._discard(key)
+            if self.eviction is not None:
+                self.eviction.remove(key)
 
     def invalidate_all(self) -> None:
-        self.cache.clear()
+        with self._lock:
+            self.cache.clear()
+            self._footprints.clear()
+            if self.eviction is not None:
+                self.eviction.clear()
+
+    def invalidate_prefix(
+        self,
+        prefix: str | bytes,
+        batch_size: int = 1000,
+        progress: Progress | None = None,
+    ) -> int:
+        # Снимок ключей, чтобы не зависеть от изменений словаря во время обхода
+        keys = [
+            key for key in list(self.cache)
+            if isinstance(key, type(prefix)) and key.startswith(prefix)
+        ]
+
+        deleted = 0
+        for start in range(0, len(keys), batch_size):
+            batch = keys[start:start + batch_size]
+            for key in batch:
+                self.invalidate(key)
+            deleted += len(batch)
+            if progress is not None and progress(deleted) is False:
+                break
+
+        return deleted
+
+    def memory_report(self, top: int = 10) -> MemoryReport:
+        # Размер элемента - длина его сериализованного представления.
+        # Количество и размер берутся из счетчиков, обход снимка кэша нужен
+        # только для истекших элементов и самых крупных ключей
+        now = time.monotonic()
+        prefix = self.key_function.function_prefix
+        with self._lock:
+            functions = {
+                name: Footprint(footprint.entries, footprint.bytes)
+                for name, footprint in self._footprints.items()
+            }
+            items = list(self.cache.items())
+
+        for key, (expiry, __) in items:
+            if expiry is not None and expiry <= now:
+                footprint = functions.get(prefix(key))
+                if footprint is not None:
+                    footprint.expired += 1
+
+        largest = heapq.nlargest(
+            top, items, key=lambda item: len(item[1][1])
+        )
+        return MemoryReport(
+            functions=functions,
+            largest=[(key, len(value)) for key, (__, value) in largest],
+        )
@@ -1,31 +1,103 @@
+import heapq
+import re
+import struct
+import threading
 from dataclasses import field
-from typing import Mapping, Type
+from typing import Hashable, Iterable, Mapping, Type
+from uuid import uuid4
+
+import msgspec
 
 try:
-    from redis import Redis
+    from redis import Redis, RedisError, ResponseError, WatchError
     from redis.client import Pipeline as RedisPipeline
 
     redis_installed = True
 except ImportError:
     Redis = RedisPipeline = Type
+    RedisError = ResponseError = WatchError = Exception
     redis_installed = False
 
 from classic.components import component
 
-from ..cache import Cache, Value, Key, Result
-from ..key_generators import MsgSpec
+from ..bloom import BloomFilter
+from ..cache import (
+    Cache, Footprint, Key, MemoryReport, Progress, Result, Value,
+)
+from ..hot_keys import HotKeys
+from ..key_generators.msgspec import MsgSpec
 
 CachedValue = tuple[Value, int | None]
 
+LEASE_PREFIX = b'lease:'
+
+# Спецсимволы шаблонов Redis (glob-style) для экранирования в SCAN MATCH
+GLOB_SPECIAL = re.compile(rb'([*?\[\]\\])')
+
+# Манифест значения, разбитого на части: маркер (JSON не начинается с
+# нулевого байта), идентификатор записи, количество частей и общий размер
+CHUNK_MARKER = b'\x00'
+CHUNK_MANIFEST = struct.Struct('>c16sIQ')
+CHUNK_SEP = b'\x00chunk:'
+
 
 @component
 class RedisCache(Cache):
     """
     Redis-реализация кэширования (TTL without history)
+
+    При `compact_keys=True` строковые и байтовые ключи записываются в Redis
+    как есть, без повторной JSON-сериализации. В паре с генератором ключей
+    `Compact` это дает короткие ключи фиксированной длины.
+
+    При заданном `bloom_filter` ключи, записанные через этот экземпляр,
+    учитываются в локальном фильтре Блума, и чтение ключей, которых там
+    точно нет, не обращается к Redis. Фильтр знает только о записях
+    текущего процесса, поэтому он перестраивается по содержимому Redis
+    при создании кэша и, если задан `bloom_rebuild_interval`, в фоновом
+    потоке каждые `bloom_rebuild_interval` секунд (см. также
+    `rebuild_bloom_filter` и `stop`). Ключ, аренду которого держит другой
+    узел, добавляется в фильтр, чтобы ожидающие увидели записанное им
+    значение.
+    `CountingBloomFilter` уменьшается только при `invalidate` ключа,
+    который был в Redis; остальные удаления оставляют ложноположительные
+    ответы до перестроения, но не создают ложноотрицательных.
+
+    При заданном `chunk_size` значения, сериализованное представление
+    которых длиннее `chunk_size` байт, записываются частями по `chunk_size`
+    под производными ключами, а по основному ключу хранится небольшой
+    манифест. Части и манифест пишутся одной транзакцией, читаются одним
+    MGET и собираются в заранее выделенный буфер. Имена частей уникальны для
+    каждой записи, поэтому читатель никогда не склеит части разных записей.
+    Манифест прежнего значения читается в той же транзакции, что и новая
+    запись (или удаление), и части прежнего значения удаляются следующим
+    запросом, только если они были, - при перезаписи любым значением и
+    при инвалидации.
+
+    При заданном `hot_keys` часто читаемые ключи обнаруживаются по выборке
+    чтений и копируются в локальное хранилище процесса с коротким временем
+    жизни, которое обновляется в фоне (см. `HotKeys`). Запись и инвалидация
+    через этот экземпляр сразу удаляют локальную копию, записи других
+    узлов становятся видны с задержкой не более `HotKeys.ttl`.
+
+    Скользящее истечение (`get_and_touch`) продлевает ключ командой GETEX
+    в том же обращении, что и чтение (нужен Redis 6.2+). Продления, которые
+    не совпадают с чтением из Redis (`touch`, попадания в локальные копии
+    горячих ключей), накапливаются и отправляются одним pipeline EXPIRE,
+    когда их набирается `touch_batch_size`, или фоновым таймером через
+    `touch_interval` секунд после первого из них. Части значений,
+    записанных частями, продлеваются вместе с манифестом.
     """
     connection: Redis
     key_function = field(default_factory=MsgSpec)
     version: int | None = None
+    bloom_filter: BloomFilter | None = None
+    bloom_rebuild_interval: float | None = None
+    compact_keys: bool = False
+    chunk_size: int | None = None
+    hot_keys: HotKeys | None = None
+    touch_batch_size: int = 100
+    touch_interval: float = 1.0
 
     def __post_init__(self):
         if not redis_installed:
@@ -33,6 +105,37 @@ class RedisCache(Cache):
                 'RedisCache requires "redis" package to be installed'
             )
 
+        self._touches: dict[bytes, int] = {}
+        self._touches_timer: threading.Timer | None = None
+        self._touches_lock = threading.Lock()
+
+        if self.hot_keys is not None:
+            self.hot_keys.loader = self._load_values
+
+        self._stopped = threading.Event()
+        if self.bloom_filter is not None:
+            self._try_rebuild_bloom_filter()
+            if self.bloom_rebuild_interval:
+                threading.Thread(
+                    target=self._rebuild_bloom_filter_periodically,
+                    name='classic-cache-bloom-filter',
+                    daemon=True,
+                ).start()
+
+    def _encode_key(self, key: Key) -> bytes:
+        """
+        Преобразование ключа доступа в ключ Redis
+        :param key: ключ доступа
+        :return: ключ Redis
+        """
+        if self.compact_keys:
+            if isinstance(key, bytes):
+                return key
+            if isinstance(key, str):
+                return key.encode()
+
+        return self._serialize(key)
+
     def _save_value(
         self,
         connection: Redis | RedisPipeline,
@@ -47,25 +150,142 @@ class RedisCache(Cache):
         :param key:  ключ доступа
         :param value: элемент для сохранения
         :param ttl: время "жизни" элемента
+        :return: ключ Redis
         """
         cached_value = (value, self.version)
-        encoded_key = self._serialize(key)
+        encoded_key = self._encode_key(key)
         encoded_value = self._serialize(cached_value)
 
-        if ttl:
+        # Ключ попадает в фильтр до записи: читатель может увидеть ключ в
+        # фильтре раньше, чем в Redis (обычный промах), но не наоборот
+        if self.bloom_filter is not None:
+            self.bloom_filter.add(encoded_key)
+        if self.hot_keys is not None:
+            self.hot_keys.discard((encoded_key,))
+
+        if self.chunk_size:
+            # Манифест прежнего значения (если оно было записано частями)
+            # читается в той же транзакции перед перезаписью
+            connection.getrange(encoded_key, 0, CHUNK_MANIFEST.size - 1)
+
+        if self.chunk_size and len(encoded_value) > self.chunk_size:
+            self._save_chunked(connection, encoded_key, encoded_value, ttl)
+        elif ttl:
             # set TTL operation (will be deleted after x seconds)
             connection.setex(encoded_key, ttl, encoded_value)
         else:
             # write as is without TTL
             connection.set(encoded_key, encoded_value)
 
+        return encoded_key
+
+    def _save_chunked(
+        self,
+        pipe: RedisPipeline,
+        encoded_key: bytes,
+        encoded_value: bytes,
+        ttl: int | None = None,
+    ) -> None:
+        """
+        Запись значения частями по `chunk_size` байт и манифеста к ним
+        """
+        write_id = uuid4().bytes
+        chunk_size = self.chunk_size
+        size = len(encoded_value)
+        parts = -(-size // chunk_size)
+
+        part_prefix = encoded_key + CHUNK_SEP + write_id.hex().encode() + b':'
+        manifest = CHUNK_MANIFEST.pack(CHUNK_MARKER, write_id, parts, size)
+
+        # Срезы memoryview передаются в redis-py без копирования
+        view = memoryview(encoded_value)
+        for index in range(parts):
+            chunk = view[index * chunk_size:(index + 1) * chunk_size]
+            pipe.set(part_prefix + b'%d' % index, chunk, ex=ttl or None)
+        pipe.set(encoded_key, manifest, ex=ttl or None)
+
+    def _part_keys(self, encoded_key: bytes, manifest: bytes) -> list[bytes]:
+        """
+        Ключи частей значения по его манифесту
+        """
+        __, write_id, parts, __ = CHUNK_MANIFEST.unpack(manifest)
+        part_prefix = encoded_key + CHUNK_SEP + write_id.hex().encode() + b':'
+        return [part_prefix + b'%d' % index for index in range(parts)]
+
+    def _unlink_parts(self, heads: Mapping[bytes, bytes]) -> None:
+        """
+        Удаляет части прежних значений, замененных или удаленных
+        :param heads: начала прежних значений по ключам Redis
+        """
+        part_keys = [
+            part_key
+            for encoded_key, head in heads.items()
+            if head.startswith(CHUNK_MARKER)
+            for part_key in self._part_keys(encoded_key, head)
+        ]
+        if part_keys:
+            self.connection.unlink(*part_keys)
+
+    def _load_chunked(
+        self,
+        manifests: Mapping[bytes, bytes],
+        ttl: int | None = None,
+    ) -> dict[bytes, bytearray | None]:
+        """
+        Чтение частей значений по их манифестам одним MGET и сборка каждого
+        значения в заранее выделенный буфер
+        :param manifests: манифесты по ключам Redis
+        :param ttl: новое время жизни частей (скользящее истечение)
+        :return: собранные значения (None, если части истекли или удалены)
+        """
+        layouts = []
+        part_keys = []
+        for encoded_key, manifest in manifests.items():
+            __, __, parts, size = CHUNK_MANIFEST.unpack(manifest)
+            part_keys.extend(self._part_keys(encoded_key, manifest))
+            layouts.append((encoded_key, parts, size))
+
+        if ttl:
+            # Продление частей - в том же обращении, что и их чтение
+            pipe = self.connection.pipeline(transaction=False)
+            pipe.mget(part_keys)
+            for part_key in part_keys:
+                pipe.expire(part_key, ttl)
+            values = pipe.execute()[0]
+        else:
+            values = self.connection.mget(part_keys)
+
+        position = 0
+        result = {}
+        for encoded_key, parts, size in layouts:
+            chunks = values[position:position + parts]
+            position += parts
+            if None in chunks or sum(map(len, chunks)) != size:
+                result[encoded_key] = None
+                continue
+
+            # Сборка без промежуточных конкатенаций: каждая часть
+            # копируется ровно один раз на свое место в буфере
+            buffer = bytearray(size)
+            view = memoryview(buffer)
+            offset = 0
+            for chunk in chunks:
+                view[offset:offset + len(chunk)] = chunk
+                offset += len(chunk)
+            result[encoded_key] = buffer
+
+        return result
+
     def set(
         self,
         key: Key,
         value: Value,
         ttl: int | None = None,
     ) -> None:
-        self._save_value(self.connection, key, value, ttl)
+        if self.chunk_size:
+            self.set_many({key: value}, ttl)
+        else:
+            self._save_value(self.connection, key, value, ttl)
 
     def set_many(
         self,
@@ -76,17 +296,91 @@ class RedisCache(Cache):
         # https://redis.io/docs/manual/pipelining/
         pipe = self.connection.pipeline()
 
+        # Позиции в pipeline, на которых прочитаны прежние манифесты
+        positions = {}
         for key, value in elements.items():
-            self._save_value(pipe, key, value, ttl)
+            position = len(pipe)
+            positions[self._save_value(pipe, key, value, ttl)] = position
+
+        results = pipe.execute()
+        if self.chunk_size:
+            self._unlink_parts({
+                encoded_key: results[position]
+                for encoded_key, position in positions.items()
+            })
 
-        pipe.execute()
+    def _maybe_exists(self, encoded_key: bytes) -> bool:
+        return self.bloom_filter is None or encoded_key in self.bloom_filter
 
     def exists(self, key: Key) -> bool:
-        return self.connection.exists(self._serialize(key))
+        encoded_key = self._encode_key(key)
+        if not self._maybe_exists(encoded_key):
+            return False
+        if (
+            self.hot_keys is not None
+            and self.hot_keys.get(encoded_key) is not None
+        ):
+            return True
+
+        return self.connection.exists(encoded_key)
+
+    def exists_many(self, keys: Iterable[Key]) -> Mapping[Key, bool]:
+        # Проверки отправляются одним pipeline без транзакции
+        result = {}
+        requested = []
+        pipe = self.connection.pipeline(transaction=False)
+        for key in keys:
+            encoded_key = self._encode_key(key)
+            if self._maybe_exists(encoded_key):
+                pipe.exists(encoded_key)
+                requested.append(key)
+            else:
+                result[key] = False
+
+        if requested:
+            for key, found in zip(requested, pipe.execute()):
+                result[key] = bool(found)
+        return result
 
     def get(self, key: Key, cast_to: Type[Value]) -> Result:
-        encoded_key = self._serialize(key)
-        value = self.connection.get(encoded_key)
+        return self._get(key, cast_to)
+
+    def get_and_touch(
+        self,
+        key: Key,
+        cast_to: Type[Value],
+        ttl: int,
+    ) -> Result:
+        return self._get(key, cast_to, ttl)
+
+    def _get(
+        self,
+        key: Key,
+        cast_to: Type[Value],
+        ttl: int | None = None,
+    ) -> Result:
+        """
+        Чтение элемента с продлением его времени жизни до `ttl`, если задано
+        """
+        encoded_key = self._encode_key(key)
+        if not self._maybe_exists(encoded_key):
+            return None, False
+
+        hot_keys = self.hot_keys
+        value = hot_keys.get(encoded_key) if hot_keys is not None else None
+        if value is not None:
+            if ttl:
+                self._touch(encoded_key, ttl)
+        else:
+            if ttl:
+                value = self.connection.getex(encoded_key, ex=ttl)
+            else:
+                value = self.connection.get(encoded_key)
+            if value is not None and value.startswith(CHUNK_MARKER):
+                value = self._load_chunked({encoded_key: value}, ttl)
+                value = value[encoded_key]
+            if hot_keys is not None:
+                hot_keys.record(encoded_key, value)
         if value is None:
             return None, False
 
@@ -97,16 +391,102 @@ class RedisCache(Cache):
 
         return value, True
 
+    def touch(self, key: Key, ttl: int) -> None:
+        self._touch(self._encode_key(key), ttl)
+
+    def _touch(self, encoded_key: bytes, ttl: int) -> None:
+        """
+        Добавляет продление ключа в очередь и отправляет очередь, если она
+        заполнена. Незаполненную очередь отправит таймер через
+        `touch_interval` секунд.
+        """
+        with self._touches_lock:
+            self._touches[encoded_key] = ttl
+            if self._touches_timer is None:
+                self._touches_timer = threading.Timer(
+                    self.touch_interval, self._flush_touches_in_background
+                )
+                self._touches_timer.daemon = True
+                self._touches_timer.start()
+            if len(self._touches) < self.touch_batch_size:
+                return
+
+        self.flush_touches()
+
+    def _flush_touches_in_background(self) -> None:
+        try:
+            self.flush_touches()
+        except Exception:
+            # Redis недоступен: продления теряются, ключи истекут сами
+            pass
+
+    def flush_touches(self) -> None:
+        """
+        Отправляет накопленные продления ключей (и частей значений,
+        записанных частями) одним pipeline
+        """
+        with self._touches_lock:
+            touches, self._touches = self._touches, {}
+            timer, self._touches_timer = self._touches_timer, None
+        if timer is not None:
+            timer.cancel()
+
+        if not touches:
+            return
+
+        pipe = self.connection.pipeline(transaction=False)
+        for encoded_key, ttl in touches.items():
+            if self.chunk_size:
+                pipe.getrange(encoded_key, 0, CHUNK_MANIFEST.size - 1)
+            pipe.expire(encoded_key, ttl)
+        results = pipe.execute()
+        if not self.chunk_size:
+            return
+
+        # Части продлеваются вторым обращением, только если они есть
+        pipe = self.connection.pipeline(transaction=False)
+        for (encoded_key, ttl), head in zip(touches.items(), results[::2]):
+            if head.startswith(CHUNK_MARKER):
+                for part_key in self._part_keys(encoded_key, head):
+                    pipe.expire(part_key, ttl)
+        if len(pipe):
+            pipe.execute()
+
     def get_many(self, keys: dict[Key, Type[Value]]) -> Mapping[Key, Result]:
-        encoded_keys = [self._serialize(key) for key in keys]
-        decoded_values = self.connection.mget(encoded_keys)
+        result = {}
+        requested = {}
+        for key, cast_to in keys.items():
+            encoded_key = self._encode_key(key)
+            if self._maybe_exists(encoded_key):
+                requested[encoded_key] = key, cast_to
+            else:
+                result[key] = None, False
+
+        if not requested:
+            return result
+
+        hot_keys = self.hot_keys
+        if hot_keys is None:
+            decoded_values = self._load_values(list(requested))
+        else:
+            local = {
+                encoded_key: hot_keys.get(encoded_key)
+                for encoded_key in requested
+            }
+            remote = [key for key, value in local.items() if value is None]
+            if remote:
+                for encoded_key, value in zip(
+                    remote, self._load_values(remote)
+                ):
+                    local[encoded_key] = value
+                    hot_keys.record(encoded_key, value)
+            decoded_values = list(local.values())
 
         # Воспользуемся zip() для облегчения процесса итерации, т.к.
         # значения возвращаются в том же порядке, как были поданы ключи.
         # Дополнительно фильтруем ключ-значение, если оно исчезло
         # из Redis'а по какой-то причине
-        result = {}
-        for (key, cast_to), value in zip(keys.items(), decoded_values):
+        for (key, cast_to), value in zip(requested.values(), decoded_values):
             if value is None:
                 result[key] = None, False
             else:
@@ -118,12 +498,271 @@ class RedisCache(Cache):
                     self.invalidate(key)
         return result
 
+    def _load_values(self, encoded_keys: list[bytes]) -> list[bytes | None]:
+        """
+        Чтение значений по ключам Redis одним MGET (и еще одним - для
+        частей значений, записанных частями)
+        """
+        values = self.connection.mget(encoded_keys)
+
+        manifests = {
+            encoded_key: value
+            for encoded_key, value in zip(encoded_keys, values)
+            if value is not None and value.startswith(CHUNK_MARKER)
+        }
+        if manifests:
+            # Части всех разбитых значений читаются одним MGET
+            chunked = self._load_chunked(manifests)
+            values = [
+                chunked[encoded_key] if encoded_key in chunked else value
+                for encoded_key, value in zip(encoded_keys, values)
+            ]
+
+        return values
+
     def invalidate(self, key: Key) -> None:
-        encoded_key = self._serialize(key)
-        # Можем вызывать as is, т.к. несуществующие ключи будут проигнорированы
-        self.connection.delete(encoded_key)
+        encoded_key = self._encode_key(key)
+        if self.chunk_size:
+            # Манифест читается в одной транзакции с удалением ключа
+            pipe = self.connection.pipeline()
+            pipe.getrange(encoded_key, 0, CHUNK_MANIFEST.size - 1)
+            pipe.delete(encoded_key)
+            head, deleted = pipe.execute()
+            self._unlink_parts({encoded_key: head})
+        else:
+            # Можем вызывать as is, т.к. несуществующие ключи будут
+            # проигнорированы
+            deleted = self.connection.delete(encoded_key)
+
+        # Счетчики фильтра уменьшаются, только если ключ действительно был
+        # удален: повторная инвалидация не должна "вычитать" соседей
+        if deleted and self.bloom_filter is not None:
+            self.bloom_filter.remove(encoded_key)
+        if self.hot_keys is not None:
+            self.hot_keys.discard((encoded_key,))
 
     def invalidate_all(self) -> None:
         # Делаем асинхронное удаление данных
         # на стороне Redis без блокировки нашего потока
         self.connection.flushdb(asynchronous=True)
+
+        if self.bloom_filter is not None:
+            self.bloom_filter.clear()
+        if self.hot_keys is not None:
+            self.hot_keys.clear()
+
+    def _encode_prefix(self, prefix: str | bytes) -> bytes:
+        """
+        Преобразование префикса ключей доступа в префикс ключей Redis
+        """
+        if self.compact_keys:
+            return self._encode_key(prefix)
+
+        if not isinstance(prefix, str):
+            raise ValueError(
+                'Prefix invalidation without compact_keys supports only '
+                'string prefixes'
+            )
+
+        # JSON-представление префикса строки совпадает с началом
+        # JSON-представления самой строки без закрывающей кавычки
+        return self._serialize(prefix)[:-1]
+
+    def invalidate_prefix(
+        self,
+        prefix: str | bytes,
+        batch_size: int = 1000,
+        progress: Progress | None = None,
+    ) -> int:
+        # Ключи обходятся курсором SCAN MATCH, поэтому Redis не блокируется
+        # даже на больших базах (в отличие от KEYS). Удаление UNLINK
+        # освобождает память в фоне и отправляется в одном pipeline с
+        # запросом следующей порции, так что на порцию - одно обращение.
+        encoded_prefix = self._encode_prefix(prefix)
+        pattern = GLOB_SPECIAL.sub(rb'\\\1', encoded_prefix) + b'*'
+
+        deleted = 0
+        cursor, keys = self.connection.scan(
+            0, match=pattern, count=batch_size
+        )
+        while True:
+            pipe = self.connection.pipeline(transaction=False)
+            if keys:
+                pipe.unlink(*keys)
+            if cursor:
+                pipe.scan(cursor, match=pattern, count=batch_size)
+            results = pipe.execute()
+
+            if keys:
+                # Фильтр Блума не уменьшаем: среди найденных ключей есть
+                # записи других узлов, части значений и аренды, которых
+                # фильтр не учитывал (остаются ложноположительные ответы)
+                deleted += results[0]
+                if self.hot_keys is not None:
+                    self.hot_keys.discard(keys)
+                if progress is not None and progress(deleted) is False:
+                    break
+
+            if not cursor:
+                break
+            cursor, keys = results[-1]
+
+        return deleted
+
+    def rebuild_bloom_filter(self, batch_size: int = 1000) -> None:
+        """
+        Перестраивает фильтр Блума по ключам, находящимся в Redis (включая
+        записанные другими узлами и без учета истекших). Ключи обходятся
+        курсором SCAN порциями по `batch_size`, не блокируя Redis.
+        :param batch_size: подсказка Redis о размере порции SCAN
+        """
+        if self.bloom_filter is None:
+            return
+
+        self.bloom_filter.rebuild(self.connection.scan_iter(count=batch_size))
+
+    def _try_rebuild_bloom_filter(self) -> None:
+        try:
+            self.rebuild_bloom_filter()
+        except (RedisError, OSError):
+            # Redis недоступен: фильтр знает только о записях этого
+            # процесса до следующего перестроения
+            pass
+
+    def _rebuild_bloom_filter_periodically(self) -> None:
+        while not self._stopped.wait(self.bloom_rebuild_interval):
+            self._try_rebuild_bloom_filter()
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновые задачи: перестроение фильтра Блума и
+        обновление локальных копий горячих ключей
+        """
+        self._stopped.set()
+        if self.hot_keys is not None:
+            self.hot_keys.stop()
+
+    def _function_prefix(self, encoded_key: bytes) -> str:
+        """
+        Префикс функции для ключа Redis (включая аренды и части значений)
+        """
+        if encoded_key.startswith(LEASE_PREFIX):
+            encoded_key = encoded_key[len(LEASE_PREFIX):]
+        # Часть значения относится к ключу, стоящему до разделителя
+        encoded_key = encoded_key.partition(CHUNK_SEP)[0]
+        if not self.compact_keys and encoded_key.startswith(b'"'):
+            # JSON-представление строкового ключа
+            try:
+                encoded_key = self._deserialize(encoded_key, str)
+            except msgspec.DecodeError:
+                encoded_key = encoded_key[1:]
+
+        return self.key_function.function_prefix(encoded_key)
+
+    def memory_report(
+        self,
+        top: int = 10,
+        sample_size: int | None = None,
+        batch_size: int = 1000,
+    ) -> MemoryReport:
+        """
+        Отчет о занимаемой памяти по функциям и о самых крупных ключах
+        Redis. Ключи обходятся курсором SCAN, размеры запрашиваются
+        командой MEMORY USAGE (или STRLEN, если сервер ее не поддерживает)
+        одним pipeline на порцию. Истекшие ключи Redis удаляет сам при
+        обходе, поэтому `expired` всегда 0.
+        :param top: количество самых крупных ключей в отчете
+        :param sample_size: ограничение количества просмотренных ключей
+         (отчет будет построен по выборке)
+        :param batch_size: подсказка Redis о размере порции SCAN
+        """
+        functions: dict[str, Footprint] = {}
+        largest: list[tuple[int, int, bytes]] = []
+        inspected = 0
+        use_strlen = False
+
+        keys = self.connection.scan_iter(count=batch_size)
+        while sample_size is None or inspected < sample_size:
+            limit = batch_size
+            if sample_size is not None:
+                limit = min(limit, sample_size - inspected)
+            batch = [key for __, key in zip(range(limit), keys)]
+            if not batch:
+                break
+
+            while True:
+                pipe = self.connection.pipeline(transaction=False)
+                for key in batch:
+                    if use_strlen:
+                        pipe.strlen(key)
+                    else:
+                        pipe.memory_usage(key)
+                try:
+                    sizes = pipe.execute()
+                    break
+                except ResponseError:
+                    if use_strlen:
+                        raise
+                    use_strlen = True
+
+            for key, size in zip(batch, sizes):
+                if size is None:
+                    # Ключ удален во время обхода
+                    continue
+
+                prefix = self._function_prefix(key)
+                footprint = functions.get(prefix)
+                if footprint is None:
+                    footprint = functions[prefix] = Footprint()
+                footprint.entries += 1
+                footprint.bytes += size
+
+                # Куча из top элементов: (размер, порядковый номер, ключ)
+                item = (size, inspected, key)
+                if len(largest) < top:
+                    heapq.heappush(largest, item)
+                elif top:
+                    heapq.heappushpop(largest, item)
+                inspected += 1
+
+        return MemoryReport(
+            functions=functions,
+            largest=[
+                (key, size) for size, __, key in sorted(largest, reverse=True)
+            ],
+        )
+
+    def _lease_key(self, key: Key) -> bytes:
+        return LEASE_PREFIX + self._encode_key(key)
+
+    def acquire_lease(self, key: Key, ttl: float) -> Hashable | None:
+        token = uuid4().bytes
+        # SET NX PX: аренду получает только первый, истекает она сама,
+        # даже если владелец "упал" и не освободил ее
+        acquired = self.connection.set(
+            self._lease_key(key), token, nx=True, px=max(int(ttl * 1000), 1)
+        )
+        if acquired:
+            return token
+
+        # Значение вычисляет другой узел: без ключа в фильтре ожидающие
+        # не увидят его запись и вычислят значение повторно
+        if self.bloom_filter is not None:
+            self.bloom_filter.add(self._encode_key(key))
+        return None
+
+    def release_lease(self, key: Key, token: Hashable) -> None:
+        lease_key = self._lease_key(key)
+        # Удаляем аренду, только если она все еще наша (могла истечь и
+        # достаться другому узлу). Проверка и удаление выполняются атомарно
+        # через WATCH/MULTI, чтобы не зависеть от поддержки Lua-скриптов
+        with self.connection.pipeline() as pipe:
+            try:
+                pipe.watch(lease_key)
+                if pipe.get(lease_key) != token:
+                    return
+                pipe.multi()
+                pipe.delete(lease_key)
+                pipe.execute()
+            except WatchError:
+                pass
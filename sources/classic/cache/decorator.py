@@ -1,19 +1,139 @@
 import functools
+import itertools
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 from datetime import timedelta
 from dataclasses import dataclass
-from typing import Callable, Type
+from typing import (
+    Any, Callable, Generic, Iterable, Iterator, Type, TypeVar, get_args,
+)
+from uuid import uuid4
 import inspect
 
+import msgspec
+
 from classic.components import add_extra_annotation
 from classic.components.types import Decorator
 
-from .cache import Cache
+from .adaptive import AdaptiveState
+from .cache import Cache, Key, Progress
+
+# Границы задержки между опросами кэша в ожидании значения, которое
+# вычисляет владелец аренды (экспоненциальный рост от минимальной)
+LEASE_POLL_DELAY = 0.005
+LEASE_MAX_POLL_DELAY = 0.1
+
+# Разделитель в ключах сегментов результатов генераторов и количество
+# сегментов, читаемых из кэша за одно обращение при попадании
+SEGMENT_SEP = ':segment:'
+STREAM_WINDOW = 4
+
+T = TypeVar('T')
+
+
+class CachedError(msgspec.Struct, array_like=True):
+    """
+    Запись о закэшированном исключении: полное имя класса и аргументы
+    """
+    type: str
+    args: tuple
+
+    @classmethod
+    def from_exception(cls, error: BaseException) -> 'CachedError':
+        error_type = type(error)
+        name = f'{error_type.__module__}:{error_type.__qualname__}'
+        return cls(name, error.args)
+
+    def restore(
+        self,
+        allowed: tuple[Type[BaseException], ...],
+    ) -> BaseException | None:
+        """
+        Восстанавливает исключение, если его класс входит в `allowed`.
+        :param allowed: Классы исключений, которые разрешено кэшировать.
+        :return: Экземпляр исключения или None, если восстановить не удалось.
+        """
+        # Класс ищется только среди разрешенных и их подклассов: имя из
+        # общего кэша не должно приводить к импорту произвольных модулей
+        error_type = _find_subclass(allowed, self.type)
+        if error_type is None:
+            return None
+
+        try:
+            return error_type(*self.args)
+        except Exception:
+            return None
+
+
+@functools.lru_cache(maxsize=1024)
+def _find_subclass(
+    bases: tuple[Type[BaseException], ...],
+    name: str,
+) -> Type[BaseException] | None:
+    """
+    Ищет класс с полным именем `module:qualname` среди `bases` и всех их
+    подклассов. Результат (в том числе отсутствие класса) запоминается,
+    так что дерево подклассов обходится один раз на имя.
+    """
+    pending = list(bases)
+    seen = set()
+    while pending:
+        cls = pending.pop()
+        if cls in seen:
+            continue
+        seen.add(cls)
+        if f'{cls.__module__}:{cls.__qualname__}' == name:
+            return cls
+        pending.extend(cls.__subclasses__())
+    return None
+
+
+class CachedOutcome(msgspec.Struct, Generic[T], array_like=True):
+    """
+    Запись в кэше для функций с кэшированием исключений: либо результат,
+    либо исключение, которое будет выброшено повторно при попадании
+    """
+    value: T | None = None
+    error: CachedError | None = None
 
 
 @dataclass
+class RefreshResult:
+    """
+    Результат обновления одного элемента в `refresh_many`.
+
+    Атрибуты:
+    args (tuple): Позиционные аргументы функции.
+    key (Key): Ключ элемента в кэше.
+    refreshed (bool): Результат вычислен и записан в кэш.
+    error (BaseException | None): Исключение при вычислении или записи.
+    Если `refreshed` и `error` пусты, элемент пропущен (`only_existing`).
+    """
+    args: tuple
+    key: Key
+    refreshed: bool = False
+    error: BaseException | None = None
+
+
+class StreamManifest(msgspec.Struct, array_like=True):
+    """
+    Запись о закэшированном результате генератора: идентификатор записи
+    (входит в ключи сегментов) и количество сегментов
+    """
+    write_id: str
+    segments: int
+
+
+def _unbound() -> None:
+    return None
+
+
 class BoundedWrapper:
     """
     Обертка для функции, которая кэширует результаты ее выполнения.
+    Создается один раз на экземпляр объекта и переиспользуется при
+    последующих обращениях к методу (см. `Wrapper.__get__`).
 
     Атрибуты:
     cache (Cache): Экземпляр кэша, который используется для хранения результатов.
@@ -22,28 +142,268 @@ class BoundedWrapper:
     return_type (Type[object]): Тип возвращаемого значения функции.
     ttl (int | None): Время жизни кэшированных результатов в секундах. Если
     None, результаты будут храниться в кэше бессрочно.
+    lease (float | None): Время жизни аренды на вычисление в секундах. Если
+    None, промахи не координируются между вызывающими.
+    negative_ttl (int | None): Время жизни результатов None в секундах. Если
+    None, для них используется `ttl`.
+    cache_exceptions (tuple[Type[BaseException], ...]): Исключения, которые
+    кэшируются и выбрасываются повторно при попадании.
+    error_ttl (int | None): Время жизни закэшированных исключений в секундах.
+    Если None, используется `ttl`.
+    adaptive (AdaptiveState | None): Оценки стоимости кэширования функции
+    (общие для всех экземпляров) в адаптивном режиме, `adaptive.caching` -
+    текущее решение. Если None, кэш используется всегда.
+    sliding (bool): Скользящее истечение: попадание продлевает время жизни
+    результата на `ttl`.
+
+    Атрибут класса `recorder` - необязательный хук записи обращений для
+    всех кэшируемых функций: вызывается с ключом и флагом попадания при
+    каждом вызове (например, `classic.cache.simulator.TraceRecorder`).
     """
-    cache: Cache
-    instance: object
-    func: Callable
-    return_type: Type[object]
-    ttl: int | None = None
+
+    recorder: Callable[[Key, bool], None] | None = None
+
+    __slots__ = (
+        'cache',
+        'instance',
+        'func',
+        'return_type',
+        'ttl',
+        'lease',
+        'negative_ttl',
+        'cache_exceptions',
+        'error_ttl',
+        'adaptive',
+        'sliding',
+    )
+
+    def __init__(
+        self,
+        cache: Cache,
+        instance: object,
+        func: Callable,
+        return_type: Type[object],
+        ttl: int | None = None,
+        lease: float | None = None,
+        negative_ttl: int | None = None,
+        cache_exceptions: tuple[Type[BaseException], ...] = (),
+        error_ttl: int | None = None,
+        adaptive: AdaptiveState | None = None,
+        sliding: bool = False,
+    ):
+        self.cache = cache
+        self.instance = instance
+        self.func = func
+        self.return_type = return_type
+        self.ttl = ttl
+        self.lease = lease
+        self.negative_ttl = negative_ttl
+        self.cache_exceptions = cache_exceptions
+        self.error_ttl = error_ttl
+        self.adaptive = adaptive
+        self.sliding = sliding
+
+    def __reduce__(self):
+        # Обертка хранится в __dict__ экземпляра (см. `Wrapper.__get__`) и
+        # не входит в его состояние: при сериализации и глубоком
+        # копировании экземпляра она заменяется на None и создается заново
+        # при первом обращении к методу
+        return _unbound, ()
 
     def __call__(self, *args, **kwargs):
         """
         Вызывает функцию и кэширует ее результаты.
         """
+        adaptive = self.adaptive
+        if adaptive is not None:
+            mode = adaptive.next_call()
+            if mode is AdaptiveState.BYPASS:
+                # Быстрый путь в обход кэша без замеров
+                return self.func(self.instance, *args, **kwargs)
+            return self._call_adaptive(adaptive, mode, *args, **kwargs)
+
+        cache = self.cache
+        fn_key = cache.key_function(self.func, *args, **kwargs)
+        if self.cache_exceptions or self.sliding:
+            cached, found = self._get(fn_key)
+        else:
+            # Быстрый путь без распаковки записей с исключениями
+            cached, found = cache.get(fn_key, self.return_type)
+
+        if self.recorder is not None:
+            self.recorder(fn_key, found)
+
+        if found:
+            return cached
+
+        if self.lease:
+            return self._call_with_lease(fn_key, *args, **kwargs)
+
+        return self._compute(fn_key, *args, **kwargs)
+
+    def _call_adaptive(
+        self,
+        adaptive: AdaptiveState,
+        mode: str,
+        *args,
+        **kwargs,
+    ):
+        """
+        Вызов в адаптивном режиме с замерами: через кэш (с замером
+        стоимости обращения к кэшу и вычисления) либо отобранный вызов в
+        обход кэша, если кэширование невыгодно.
+        """
+        if mode is AdaptiveState.SAMPLE:
+            # Отобранный вызов: замер вычисления и стоимости отбора, которая
+            # распределяется на все вызовы в обход кэша. Ключ нужен только
+            # для оценки повторов вызовов
+            start = time.perf_counter()
+            result = self.func(self.instance, *args, **kwargs)
+            computed = time.perf_counter()
+            adaptive.record_reuse(
+                self.cache.key_function(self.func, *args, **kwargs)
+            )
+            overhead = time.perf_counter() - computed
+            adaptive.record_bypass(
+                computed - start, overhead / adaptive.reuse_interval
+            )
+            return result
+
+        start = time.perf_counter()
         fn_key = self.cache.key_function(self.func, *args, **kwargs)
-        cached, found = self.cache.get(fn_key, self.return_type)
+        cached, found = self._get(fn_key)
+        looked_up = time.perf_counter()
+        adaptive.record_lookup(looked_up - start, found)
+
+        if self.recorder is not None:
+            self.recorder(fn_key, found)
+
         if found:
             return cached
 
-        result = self.func(self.instance, *args, **kwargs)
+        if self.lease:
+            result = self._call_with_lease(fn_key, *args, **kwargs)
+            adaptive.record_miss(time.perf_counter() - looked_up)
+            return result
 
-        self.cache.set(fn_key, result, self.ttl)
+        # То же, что _compute, но с раздельным замером вычисления и записи
+        try:
+            result = self.func(self.instance, *args, **kwargs)
+        except self.cache_exceptions as error:
+            self._store_error(fn_key, error)
+            raise
 
+        computed = time.perf_counter()
+        self._store(fn_key, result)
+        adaptive.record_compute(computed - looked_up)
+        adaptive.record_miss(time.perf_counter() - looked_up)
         return result
 
+    def _read(self, fn_key: Key, cast_to: Type[object]):
+        """
+        Чтение из кэша, при скользящем истечении - с продлением на `ttl`
+        """
+        if self.sliding:
+            return self.cache.get_and_touch(fn_key, cast_to, self.ttl)
+        return self.cache.get(fn_key, cast_to)
+
+    def _get(self, fn_key: Key):
+        """
+        Получает результат из кэша. Закэшированное исключение выбрасывается
+        повторно, а запись, которую не удалось восстановить, считается
+        промахом.
+        """
+        if not self.cache_exceptions:
+            return self._read(fn_key, self.return_type)
+
+        outcome, found = self._read(fn_key, CachedOutcome[self.return_type])
+        if not found:
+            return None, False
+
+        if outcome.error is not None:
+            error = outcome.error.restore(self.cache_exceptions)
+            if error is None:
+                return None, False
+            raise error
+
+        return outcome.value, True
+
+    def _compute(self, fn_key: Key, *args, **kwargs):
+        """
+        Вычисляет функцию и сохраняет в кэше результат или исключение из
+        числа `cache_exceptions`.
+        """
+        try:
+            result = self.func(self.instance, *args, **kwargs)
+        except self.cache_exceptions as error:
+            self._store_error(fn_key, error)
+            raise
+
+        self._store(fn_key, result)
+        return result
+
+    def _prepare(self, result) -> tuple[Any, int | None]:
+        """
+        Запись для кэша и ее время жизни для результата функции
+        """
+        ttl = self.ttl
+        if result is None and self.negative_ttl is not None:
+            ttl = self.negative_ttl
+
+        if self.cache_exceptions:
+            result = CachedOutcome(value=result)
+
+        return result, ttl
+
+    def _store(self, fn_key: Key, result) -> None:
+        value, ttl = self._prepare(result)
+        self.cache.set(fn_key, value, ttl)
+
+    def _store_error(self, fn_key: Key, error: BaseException) -> None:
+        ttl = self.ttl if self.error_ttl is None else self.error_ttl
+        try:
+            outcome = CachedOutcome(error=CachedError.from_exception(error))
+            self.cache.set(fn_key, outcome, ttl)
+        except TypeError:
+            # Аргументы исключения не сериализуются - просто не кэшируем
+            pass
+
+    def _call_with_lease(self, fn_key: Key, *args, **kwargs):
+        """
+        Вычисляет результат под арендой: вычисляет только захвативший аренду,
+        остальные с ограниченной экспоненциальной задержкой опрашивают кэш и
+        читают записанное им значение. Если за время жизни аренды значение
+        так и не появилось, функция вычисляется без координации.
+        """
+        deadline = time.monotonic() + self.lease
+        delay = LEASE_POLL_DELAY
+
+        while True:
+            token = self.cache.acquire_lease(fn_key, self.lease)
+            if token is not None:
+                try:
+                    # Предыдущий владелец мог успеть записать значение между
+                    # нашим промахом и захватом аренды
+                    cached, found = self._get(fn_key)
+                    if found:
+                        return cached
+
+                    return self._compute(fn_key, *args, **kwargs)
+                finally:
+                    self.cache.release_lease(fn_key, token)
+
+            if time.monotonic() >= deadline:
+                break
+
+            time.sleep(delay)
+            delay = min(delay * 2, LEASE_MAX_POLL_DELAY)
+
+            cached, found = self._get(fn_key)
+            if found:
+                return cached
+
+        return self._compute(fn_key, *args, **kwargs)
+
     def invalidate(self, *args, **kwargs):
         """
         Инвалидирует кэшированный результат функции.
@@ -51,13 +411,121 @@ class BoundedWrapper:
         fn_key = self.cache.key_function(self.func, *args, **kwargs)
         self.cache.invalidate(fn_key)
 
+    def invalidate_all(
+        self,
+        batch_size: int = 1000,
+        progress: Progress | None = None,
+    ) -> int:
+        """
+        Инвалидирует все кэшированные результаты функции (для любых
+        аргументов), не затрагивая другие элементы кэша. Ключи удаляются по
+        общему префиксу `module->qualname` порциями по `batch_size`.
+        :param progress: Вызывается после каждой порции с общим числом
+         удаленных ключей. Если вернет False, удаление прерывается.
+        :return: Количество удаленных ключей.
+        """
+        key_function = self.cache.key_function
+        # Ключ без аргументов совпадает с префиксом ключей функции
+        fn_key = key_function(self.func)
+        separator = key_function.ARGS_SEP
+        if isinstance(fn_key, bytes):
+            separator = separator.encode()
+
+        self.cache.invalidate(fn_key)
+        return self.cache.invalidate_prefix(
+            fn_key + separator, batch_size, progress
+        )
+
     def refresh(self, *args, **kwargs):
         """
         Обновляет кэшированный результат функции, вызывая ее заново.
         """
         fn_key = self.cache.key_function(self.func, *args, **kwargs)
-        result = self.func(self.instance, *args, **kwargs)
-        self.cache.set(fn_key, result, self.ttl)
+        self._compute(fn_key, *args, **kwargs)
+
+    def _refresh_targets(
+        self,
+        arg_list: Iterable[Any],
+        only_existing: bool,
+    ) -> tuple[list[RefreshResult], list[RefreshResult]]:
+        """
+        Результаты для всех аргументов `refresh_many` и те из них, которые
+        нужно обновить
+        """
+        results = []
+        for args in arg_list:
+            if not isinstance(args, tuple):
+                args = (args,)
+            results.append(
+                RefreshResult(args, self.cache.key_function(self.func, *args))
+            )
+
+        if not only_existing:
+            return results, results
+
+        existing = self.cache.exists_many({item.key for item in results})
+        return results, [item for item in results if existing.get(item.key)]
+
+    def refresh_many(
+        self,
+        arg_list: Iterable[Any],
+        max_workers: int = 8,
+        only_existing: bool = False,
+        batch_size: int = 100,
+    ) -> list[RefreshResult]:
+        """
+        Массово обновляет кэшированные результаты функции (например, для
+        прогрева кэша перед пиком нагрузки). Результаты вычисляются в пуле
+        из `max_workers` потоков и записываются в кэш через `set_many`
+        порциями по `batch_size`.
+        :param arg_list: Аргументы вызовов: кортеж - позиционные аргументы,
+         любое другое значение - единственный аргумент.
+        :param only_existing: Обновлять только элементы, которые уже есть в
+         кэше (существование проверяется одним обращением `exists_many`).
+        :return: Результаты обновления в порядке `arg_list`.
+        """
+        cache = self.cache
+        results, pending = self._refresh_targets(arg_list, only_existing)
+
+        def compute(item: RefreshResult):
+            try:
+                return self.func(self.instance, *item.args), None
+            except Exception as error:
+                return None, error
+
+        # Записи группируются по времени жизни: set_many принимает один TTL
+        batches: dict[int | None, list[tuple[RefreshResult, Any]]] = {}
+
+        def flush(ttl: int | None) -> None:
+            batch = batches.pop(ttl)
+            try:
+                cache.set_many({item.key: value for item, value in batch}, ttl)
+            except Exception as error:
+                for item, __ in batch:
+                    item.error = error
+            else:
+                for item, __ in batch:
+                    item.refreshed = True
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            computed = executor.map(compute, pending)
+            for item, (result, error) in zip(pending, computed):
+                if error is not None:
+                    item.error = error
+                    if isinstance(error, self.cache_exceptions):
+                        self._store_error(item.key, error)
+                    continue
+
+                value, ttl = self._prepare(result)
+                batch = batches.setdefault(ttl, [])
+                batch.append((item, value))
+                if len(batch) >= batch_size:
+                    flush(ttl)
+
+        for ttl in list(batches):
+            flush(ttl)
+
+        return results
 
     def refresh_if_exists(self, *args, **kwargs):
         """
@@ -66,8 +534,186 @@ class BoundedWrapper:
         fn_key = self.cache.key_function(self.func, *args, **kwargs)
         found = self.cache.exists(fn_key)
         if found:
-            result = self.func(*args, **kwargs)
-            self.cache.set(fn_key, result, self.ttl)
+            self._compute(fn_key, *args, **kwargs)
+
+
+class StreamingWrapper(BoundedWrapper):
+    """
+    Обертка для функции-генератора. При промахе элементы передаются
+    вызывающему по мере вычисления и записываются в кэш сегментами по
+    `segment_size` элементов, а запись о результате (`StreamManifest`)
+    сохраняется последней, когда генератор исчерпан. Если вызывающий
+    прекратил итерацию раньше или генератор выбросил исключение, уже
+    записанные сегменты удаляются, и запись о результате не сохраняется.
+    Сегменты результата, который был замещен новой записью, удаляются ее
+    автором. Чтение и замена записи о результате не атомарны, поэтому при
+    одновременных промахах сегменты проигравшей записи могут остаться до
+    истечения (для генераторов без `ttl` - до инвалидации функции). При
+    попадании
+    сегменты читаются лениво, окнами по `STREAM_WINDOW` через `get_many`,
+    так что первый элемент доступен до загрузки всего результата.
+
+    Сегменты живут на секунду дольше записи о результате. Если сегмент все
+    же пропал (например, вытеснен), оставшиеся элементы вычисляются
+    функцией заново (генератор должен быть детерминированным).
+    """
+
+    __slots__ = ('segment_size',)
+
+    def __init__(
+        self,
+        cache: Cache,
+        instance: object,
+        func: Callable,
+        return_type: Type[object],
+        ttl: int | None = None,
+        segment_size: int = 100,
+    ):
+        super().__init__(cache, instance, func, return_type, ttl)
+        self.segment_size = segment_size
+
+    def __call__(self, *args, **kwargs) -> Iterator:
+        fn_key = self.cache.key_function(self.func, *args, **kwargs)
+        return self._stream(fn_key, args, kwargs)
+
+    def _segment_key(self, fn_key: Key, write_id: str, index: int) -> Key:
+        if isinstance(fn_key, str):
+            return f'{fn_key}{SEGMENT_SEP}{write_id}:{index}'
+        if isinstance(fn_key, bytes):
+            return fn_key + f'{SEGMENT_SEP}{write_id}:{index}'.encode()
+        return fn_key, write_id, index
+
+    def _segment_keys(self, fn_key: Key, manifest: StreamManifest) -> list:
+        return [
+            self._segment_key(fn_key, manifest.write_id, index)
+            for index in range(manifest.segments)
+        ]
+
+    def _manifest(self, fn_key: Key) -> StreamManifest | None:
+        manifest, found = self.cache.get(fn_key, StreamManifest)
+        return manifest if found else None
+
+    def _stream(self, fn_key: Key, args: tuple, kwargs: dict) -> Iterator:
+        manifest = self._manifest(fn_key)
+        if self.recorder is not None:
+            self.recorder(fn_key, manifest is not None)
+
+        if manifest is None:
+            yield from self._compute_stream(fn_key, args, kwargs)
+            return
+
+        segment_keys = self._segment_keys(fn_key, manifest)
+        segment_type = list[self.return_type]
+        yielded = 0
+        for start in range(0, len(segment_keys), STREAM_WINDOW):
+            window = segment_keys[start:start + STREAM_WINDOW]
+            segments = self.cache.get_many(dict.fromkeys(window, segment_type))
+            for segment_key in window:
+                items, found = segments[segment_key]
+                if not found:
+                    # Результат неполон: он будет вычислен заново при
+                    # следующем вызове, а сейчас досчитываем остаток
+                    self.cache.invalidate(fn_key)
+                    for orphan_key in segment_keys:
+                        self.cache.invalidate(orphan_key)
+                    yield from itertools.islice(
+                        self.func(self.instance, *args, **kwargs),
+                        yielded, None,
+                    )
+                    return
+
+                yield from items
+                yielded += len(items)
+
+    def _compute_stream(
+        self,
+        fn_key: Key,
+        args: tuple,
+        kwargs: dict,
+    ) -> Iterator:
+        """
+        Передает элементы генератора вызывающему и записывает их в кэш
+        сегментами. Сегменты замещенного результата удаляются после записи
+        нового, а при прерванной итерации удаляются уже записанные сегменты.
+        """
+        write_id = uuid4().hex
+        segment_ttl = self.ttl + 1 if self.ttl else None
+        manifest = StreamManifest(write_id, 0)
+        segment = []
+
+        try:
+            for item in self.func(self.instance, *args, **kwargs):
+                yield item
+                segment.append(item)
+                if len(segment) >= self.segment_size:
+                    self.cache.set(
+                        self._segment_key(fn_key, write_id, manifest.segments),
+                        segment, segment_ttl,
+                    )
+                    manifest.segments += 1
+                    segment = []
+
+            if segment:
+                self.cache.set(
+                    self._segment_key(fn_key, write_id, manifest.segments),
+                    segment, segment_ttl,
+                )
+                manifest.segments += 1
+
+            previous = self._manifest(fn_key)
+            self.cache.set(fn_key, manifest, self.ttl)
+        except BaseException:
+            # В том числе GeneratorExit при закрытии генератора вызывающим
+            for segment_key in self._segment_keys(fn_key, manifest):
+                self.cache.invalidate(segment_key)
+            raise
+
+        if previous is not None and previous.write_id != write_id:
+            for segment_key in self._segment_keys(fn_key, previous):
+                self.cache.invalidate(segment_key)
+
+    def invalidate(self, *args, **kwargs):
+        fn_key = self.cache.key_function(self.func, *args, **kwargs)
+        manifest = self._manifest(fn_key)
+        self.cache.invalidate(fn_key)
+        if manifest is not None:
+            for segment_key in self._segment_keys(fn_key, manifest):
+                self.cache.invalidate(segment_key)
+
+    def refresh(self, *args, **kwargs):
+        fn_key = self.cache.key_function(self.func, *args, **kwargs)
+        stream = self._compute_stream(fn_key, args, kwargs)
+        # Исчерпываем генератор, не накапливая элементы
+        deque(stream, maxlen=0)
+
+    def refresh_if_exists(self, *args, **kwargs):
+        fn_key = self.cache.key_function(self.func, *args, **kwargs)
+        if self.cache.exists(fn_key):
+            self.refresh(*args, **kwargs)
+
+    def refresh_many(
+        self,
+        arg_list: Iterable[Any],
+        max_workers: int = 8,
+        only_existing: bool = False,
+        batch_size: int = 100,
+    ) -> list[RefreshResult]:
+        # Результат генератора пишется сегментами по мере вычисления,
+        # поэтому каждый элемент целиком обновляется в своем потоке
+        results, pending = self._refresh_targets(arg_list, only_existing)
+
+        def refresh(item: RefreshResult) -> None:
+            try:
+                self.refresh(*item.args)
+            except Exception as error:
+                item.error = error
+            else:
+                item.refreshed = True
+
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            deque(executor.map(refresh, pending), maxlen=0)
+
+        return results
 
 
 @dataclass
@@ -82,30 +728,102 @@ class Wrapper:
     attr (str): Имя атрибута, содержащего экземпляр кэша.
     ttl (int | None): Время жизни кэшированных результатов в секундах. Если
     None, результаты будут храниться в кэше бессрочно.
+    lease (float | None): Время жизни аренды на вычисление в секундах.
+    negative_ttl (int | None): Время жизни результатов None в секундах.
+    cache_exceptions (tuple[Type[BaseException], ...]): Кэшируемые исключения.
+    error_ttl (int | None): Время жизни закэшированных исключений в секундах.
+    adaptive (AdaptiveState | None): Оценки стоимости кэширования функции в
+    адаптивном режиме.
+    segment_size (int | None): Количество элементов в сегменте для
+    функций-генераторов (для остальных функций - None).
+    sliding (bool): Скользящее истечение результатов.
     """
     func: Callable
     return_type: Type[object]
     attr: str
     ttl: int | None = None
+    lease: float | None = None
+    negative_ttl: int | None = None
+    cache_exceptions: tuple[Type[BaseException], ...] = ()
+    error_ttl: int | None = None
+    adaptive: AdaptiveState | None = None
+    segment_size: int | None = None
+    sliding: bool = False
+
+    def __post_init__(self):
+        # Имя, под которым BoundedWrapper хранится в __dict__ экземпляра
+        self.bound_attr = f'__cached_{self.func.__qualname__}'
 
     def __get__(self, instance, owner):
         """
         Возвращает экземпляр BoundedWrapper при вызове как атрибута экземпляра.
+        Обертка создается при первом обращении и хранится в экземпляре, так
+        что повторные обращения не создают новых объектов. Она пересоздается,
+        если у экземпляра сменился кэш или экземпляр был скопирован.
         """
         if instance is None:
             return self
 
+        try:
+            bound = instance.__dict__[self.bound_attr]
+            if (
+                bound.instance is instance
+                and bound.cache is getattr(instance, self.attr)
+            ):
+                return bound
+        except (AttributeError, KeyError):
+            pass
+
+        bound = self.bind(getattr(instance, self.attr), instance)
+        try:
+            instance.__dict__[self.bound_attr] = bound
+        except AttributeError:
+            # У экземпляров со __slots__ без __dict__ хранить обертку негде
+            pass
+
+        return bound
+
+    def bind(self, cache: Cache, instance: object) -> BoundedWrapper:
+        """
+        Создает BoundedWrapper для экземпляра объекта и кэша.
+        """
+        if self.segment_size is not None:
+            return StreamingWrapper(
+                cache,
+                instance,
+                self.func,
+                self.return_type,
+                self.ttl,
+                self.segment_size,
+            )
+
         return BoundedWrapper(
-            getattr(instance, self.attr),
+            cache,
             instance,
             self.func,
             self.return_type,
             self.ttl,
+            self.lease,
+            self.negative_ttl,
+            self.cache_exceptions,
+            self.error_ttl,
+            self.adaptive,
+            self.sliding,
         )
 
 
 # @cached(ttl=timedelta(hours=1)) (пример использования)
-def cached(ttl: int | timedelta | None = None, attr: str = 'cache') -> Decorator:
+def cached(
+    ttl: int | timedelta | None = None,
+    attr: str = 'cache',
+    lease: float | timedelta | None = None,
+    negative_ttl: int | timedelta | None = None,
+    cache_exceptions: tuple[Type[BaseException], ...] = (),
+    error_ttl: int | timedelta | None = None,
+    adaptive: bool | AdaptiveState = False,
+    segment_size: int = 100,
+    sliding: bool = False,
+) -> Decorator:
     """
     Декоратор для кэширования результатов функции.
 
@@ -114,6 +832,32 @@ def cached(ttl: int | timedelta | None = None, attr: str = 'cache') -> Decorator
     передано значение типа timedelta, оно будет преобразовано в секунды. Если
     None, результаты будут храниться в кэше бессрочно.
     attr (str): Имя атрибута, содержащего экземпляр кэша.
+    lease (float | timedelta | None): Время жизни аренды на вычисление при
+    промахе. Если задано, при одновременном промахе по одному ключу функцию
+    вычисляет только захвативший аренду (в том числе на разных узлах при
+    использовании RedisCache), остальные дожидаются его результата. Должно
+    превышать типичное время вычисления функции.
+    negative_ttl (int | timedelta | None): Время жизни результатов None
+    ("не найдено"), обычно более короткое, чем `ttl`. Если None, для них
+    используется `ttl`.
+    cache_exceptions (tuple[Type[BaseException], ...]): Исключения, которые
+    кэшируются наравне с результатами и выбрасываются повторно при попадании
+    вместо повторного вызова функции.
+    error_ttl (int | timedelta | None): Время жизни закэшированных
+    исключений. Если None, используется `ttl`.
+    adaptive (bool | AdaptiveState): Адаптивный режим: кэш обходится, если
+    по замерам обращение к нему дороже вычисления функции (с учетом доли
+    попаданий), и периодически проверяется снова. Можно передать
+    `AdaptiveState` с собственными параметрами. Текущее решение доступно
+    как `method.adaptive.caching`.
+    segment_size (int): Количество элементов в сегменте для
+    функций-генераторов. Их результаты кэшируются по частям, не собирая
+    все элементы в памяти (см. `StreamingWrapper`). Тип элементов берется
+    из аннотации `Iterator[T]`.
+    sliding (bool): Скользящее истечение: каждое попадание продлевает время
+    жизни результата на `ttl`, так что используемые результаты не истекают,
+    а неиспользуемые истекают через `ttl` после последнего обращения.
+    Требует `ttl` и несовместимо с `negative_ttl` и `error_ttl`.
 
     Возвращает:
     Decorator: Декоратор, который можно применить к функции для кэширования ее
@@ -123,13 +867,51 @@ def cached(ttl: int | timedelta | None = None, attr: str = 'cache') -> Decorator
     if ttl and isinstance(ttl, timedelta):
         ttl = int(ttl.total_seconds())
 
+    if lease and isinstance(lease, timedelta):
+        lease = lease.total_seconds()
+
+    if negative_ttl and isinstance(negative_ttl, timedelta):
+        negative_ttl = int(negative_ttl.total_seconds())
+
+    if error_ttl and isinstance(error_ttl, timedelta):
+        error_ttl = int(error_ttl.total_seconds())
+
+    assert not sliding or (
+        ttl and negative_ttl is None and error_ttl is None
+    ), (
+        'Скользящее истечение требует ttl и несовместимо с negative_ttl '
+        'и error_ttl'
+    )
+
     def inner(func: Callable):
         return_type = inspect.signature(func).return_annotation
         assert return_type != inspect.Signature.empty, (
             'Необходимо указать аннотацию возвращаемого значения функции'
         )
 
-        wrapper = Wrapper(func, return_type, attr, ttl)
+        # Состояние создается на каждую функцию, а не на вызов декоратора
+        state = adaptive
+        if state is True:
+            state = AdaptiveState()
+        elif state is False:
+            state = None
+
+        segments = None
+        if inspect.isgeneratorfunction(func):
+            assert not (lease or cache_exceptions or state or sliding), (
+                'Для функций-генераторов не поддерживаются lease, '
+                'cache_exceptions, adaptive и sliding'
+            )
+            # Iterator[T], Iterable[T] или Generator[T, ...] - кэшируем T
+            item_types = get_args(return_type)
+            return_type = item_types[0] if item_types else Any
+            segments = segment_size
+
+        wrapper = Wrapper(
+            func, return_type, attr, ttl, lease,
+            negative_ttl, tuple(cache_exceptions), error_ttl, state,
+            segments, sliding,
+        )
 
         wrapper = functools.update_wrapper(wrapper, func)
         wrapper = add_extra_annotation(wrapper, 'cache', Cache)
@@ -0,0 +1,173 @@
+import random
+import threading
+import time
+from typing import Callable, Iterable
+
+from .sketch import CountMinSketch
+
+# Загрузка значений ключей из удаленного хранилища (None - ключа нет)
+Loader = Callable[[list[bytes]], list[bytes | None]]
+
+
+class HotKeys:
+    """
+    Обнаружение "горячих" ключей и их локальные копии.
+
+    Каждое чтение из удаленного кэша с вероятностью `sample_rate`
+    учитывается в count-min sketch. Ключ, оценка частоты которого достигла
+    `threshold`, копируется в небольшое локальное хранилище (не более
+    `capacity` ключей), и следующие чтения обслуживаются без обращения к
+    удаленному кэшу. Фоновый поток каждые `ttl / 2` секунд перечитывает
+    локальные копии одним запросом и отбрасывает ключи, к которым с
+    прошлого обновления не было обращений. Если обновление не удается,
+    копия перестает использоваться через `ttl` секунд после последнего
+    успешного чтения, то есть локальное значение отстает от удаленного не
+    более чем на `ttl`.
+    """
+
+    def __init__(
+        self,
+        threshold: int = 8,
+        sample_rate: float = 0.01,
+        capacity: int = 32,
+        ttl: float = 1.0,
+        width: int = 1024,
+    ):
+        """
+        :param threshold: оценка частоты (в выборке), с которой ключ
+         считается горячим, не более `CountMinSketch.MAX_COUNTER`
+        :param sample_rate: доля чтений, учитываемых в оценке частоты
+        :param capacity: максимальное количество локальных копий
+        :param ttl: максимальное время жизни локальной копии в секундах
+        :param width: ширина count-min sketch
+        """
+        assert 0 < threshold <= CountMinSketch.MAX_COUNTER
+        assert 0 < sample_rate <= 1 and capacity > 0 and ttl > 0
+
+        self.threshold = threshold
+        self.sample_rate = sample_rate
+        self.capacity = capacity
+        self.ttl = ttl
+        self.sketch = CountMinSketch(width)
+        self.loader: Loader | None = None
+
+        # ключ -> [срок годности, значение, попадания, попадания на момент
+        # последнего обновления]
+        self._entries: dict[bytes, list] = {}
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread: threading.Thread | None = None
+
+    def get(self, key: bytes) -> bytes | None:
+        """
+        Локальная копия значения ключа (None, если ключ не горячий)
+        """
+        entry = self._entries.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            return None
+
+        # Счетчик приблизителен при конкурентных чтениях, что
+        # допустимо для статистики и отбора
+        entry[2] += 1
+        return entry[1]
+
+    def record(self, key: bytes, value: bytes | None) -> None:
+        """
+        Учитывает чтение ключа из удаленного кэша
+        :param key: ключ
+        :param value: прочитанное значение (None - промах)
+        """
+        if random.random() >= self.sample_rate:
+            return
+
+        with self._lock:
+            self.sketch.increment(key)
+            if (
+                value is None
+                or key in self._entries
+                or len(self._entries) >= self.capacity
+                or self.sketch.estimate(key) < self.threshold
+            ):
+                return
+
+            self._entries[key] = [time.monotonic() + self.ttl, value, 0, 0]
+
+        self._start()
+
+    def discard(self, keys: Iterable[bytes]) -> None:
+        """
+        Удаляет локальные копии (при записи или инвалидации ключей)
+        """
+        with self._lock:
+            for key in keys:
+                self._entries.pop(key, None)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            self.sketch.clear()
+
+    def stats(self) -> dict[bytes, int]:
+        """
+        Текущие горячие ключи и число локальных попаданий по ним
+        (по убыванию)
+        """
+        with self._lock:
+            hits = {key: entry[2] for key, entry in self._entries.items()}
+        return dict(sorted(hits.items(), key=lambda item: -item[1]))
+
+    def refresh(self) -> None:
+        """
+        Перечитывает локальные копии, которые использовались с прошлого
+        обновления, и отбрасывает остальные
+        """
+        with self._lock:
+            for key, entry in list(self._entries.items()):
+                if entry[2] == entry[3]:
+                    del self._entries[key]
+                else:
+                    entry[3] = entry[2]
+            keys = list(self._entries)
+
+        if not keys or self.loader is None:
+            return
+
+        values = self.loader(keys)
+        expiry = time.monotonic() + self.ttl
+
+        with self._lock:
+            for key, value in zip(keys, values):
+                entry = self._entries.get(key)
+                if entry is None:
+                    # Ключ записан или инвалидирован во время чтения
+                    continue
+                if value is None:
+                    del self._entries[key]
+                else:
+                    entry[0], entry[1] = expiry, value
+
+    def stop(self) -> None:
+        """
+        Останавливает фоновое обновление
+        """
+        self._stopped.set()
+
+    def _start(self) -> None:
+        if self._thread is not None:
+            return
+
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._thread = threading.Thread(
+                target=self._run, name='classic-cache-hot-keys', daemon=True
+            )
+        self._thread.start()
+
+    def _run(self) -> None:
+        while not self._stopped.wait(self.ttl / 2):
+            try:
+                self.refresh()
+            except Exception:
+                # Удаленный кэш недоступен: копии истекут сами
+                pass
@@ -21,16 +21,11 @@ class FuncKeyCreator(ABC):
         """
         ...
 
-    def __call__(self, func: Callable, *args, **kwargs) -> str:
+    def prefix(self, func: Callable) -> str:
         """
-        Преобразование функции и ее аргументов в ключ доступа элемента кэша.
-
-        Аргументы функции **должны** обладать возможностью отдавать
-        своё хэш-представление!
+        Стабильный префикс ключей функции вида `module->qualname`, общий для
+        всех ее аргументов.
         """
-
-        hashed_arguments = self.hash_arguments(*args, **kwargs)
-
         function_name = func.__qualname__
 
         # TODO: отлавливаем ли статические методы в кейсах наследования классов?
@@ -42,7 +37,35 @@ class FuncKeyCreator(ABC):
             )
             function_name = origin.__qualname__
 
-        func_key = f'{func.__module__}{self.MODULE_SEP}{function_name}'
+        return f'{func.__module__}{self.MODULE_SEP}{function_name}'
+
+    def function_prefix(self, key: Hashable) -> str:
+        """
+        Префикс функции `module->qualname` для ключа, построенного этим
+        генератором (пустая строка для ключей, не относящихся к функциям).
+        """
+        if isinstance(key, bytes):
+            key = key.decode(errors='replace')
+        elif not isinstance(key, str):
+            return ''
+
+        module, separator, rest = key.partition(self.MODULE_SEP)
+        if not separator:
+            return ''
+
+        return f'{module}{separator}{rest.partition(self.ARGS_SEP)[0]}'
+
+    def __call__(self, func: Callable, *args, **kwargs) -> str:
+        """
+        Преобразование функции и ее аргументов в ключ доступа элемента кэша.
+
+        Аргументы функции **должны** обладать возможностью отдавать
+        своё хэш-представление!
+        """
+
+        hashed_arguments = self.hash_arguments(*args, **kwargs)
+
+        func_key = self.prefix(func)
         return (
             f'{func_key}{self.ARGS_SEP}{hashed_arguments}'
             if hashed_arguments else func_key
@@ -1,6 +1,38 @@
-from .blake2b import Blake2b
-from .orjson import OrJson
-from .pure_hash import PureHash
-from .msgspec import MsgSpec
+import importlib
+from typing import TYPE_CHECKING
 
-__all__ = (Blake2b, PureHash, OrJson, MsgSpec)
+if TYPE_CHECKING:
+    from .blake2b import Blake2b
+    from .compact import Compact
+    from .orjson import OrJson
+    from .pure_hash import PureHash
+    from .msgspec import MsgSpec
+
+# Генераторы загружаются лениво: например, orjson импортируется только при
+# обращении к OrJson
+_LAZY_ATTRIBUTES = {
+    'Blake2b': '.blake2b',
+    'Compact': '.compact',
+    'PureHash': '.pure_hash',
+    'OrJson': '.orjson',
+    'MsgSpec': '.msgspec',
+}
+
+__all__ = tuple(_LAZY_ATTRIBUTES)
+
+
+def __getattr__(name: str):
+    try:
+        module_name = _LAZY_ATTRIBUTES[name]
+    except KeyError:
+        raise AttributeError(
+            f'module {__name__!r} has no attribute {name!r}'
+        ) from None
+
+    value = getattr(importlib.import_module(module_name, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__():
+    return sorted({*globals(), *_LAZY_ATTRIBUTES})
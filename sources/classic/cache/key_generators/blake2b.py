@@ -1,7 +1,7 @@
 from typing import Hashable
 
 from hashlib import blake2b
-from pickle import dumps
+from pickle import dumps, HIGHEST_PROTOCOL
 
 from ..key_generator import FuncKeyCreator
 
@@ -12,17 +12,20 @@ class Blake2b(FuncKeyCreator):
     (более медленная, чем `PureHash`, однако более устойчивая к коллизиям)
     """
 
+    def __init__(self, digest_size: int = 64):
+        """
+        :param digest_size: длина дайджеста в байтах (не более 64)
+        """
+        self.digest_size = digest_size
+
     def hash_arguments(self, *args, **kwargs) -> Hashable | None:
         if not (args or kwargs):
             return None
 
-        hash_instance = blake2b()
-        kwargs = {key: kwargs[key] for key in sorted(kwargs.keys())}
-
-        for arg in args:
-            hash_instance.update(dumps(arg))
-
-        for key, value in kwargs.items():
-            hash_instance.update(dumps((key, value)))
+        # Сериализуем все аргументы разом, а не каждый по отдельности
+        arguments = (args, tuple(sorted(kwargs.items())))
 
-        return hash_instance.hexdigest()
+        return blake2b(
+            dumps(arguments, protocol=HIGHEST_PROTOCOL),
+            digest_size=self.digest_size,
+        ).hexdigest()
@@ -0,0 +1,40 @@
+from hashlib import blake2b
+from typing import Callable
+
+import msgspec
+
+from ..key_generator import FuncKeyCreator
+
+
+class Compact(FuncKeyCreator):
+    """
+    Компактные ключи в виде байтов: префикс функции `module->qualname` и
+    усеченный дайджест **blake2b** аргументов, закодированных msgspec
+    (msgpack). Длина ключа не зависит от размера аргументов.
+    """
+
+    def __init__(self, digest_size: int = 16):
+        """
+        :param digest_size: длина дайджеста аргументов в байтах (не более 64)
+        """
+        self.digest_size = digest_size
+        self.encoder = msgspec.msgpack.Encoder()
+
+    def hash_arguments(self, *args, **kwargs) -> bytes | None:
+        if not (args or kwargs):
+            return None
+
+        arguments = (args, sorted(kwargs.items()))
+
+        return blake2b(
+            self.encoder.encode(arguments), digest_size=self.digest_size
+        ).digest()
+
+    def __call__(self, func: Callable, *args, **kwargs) -> bytes:
+        hashed_arguments = self.hash_arguments(*args, **kwargs)
+
+        func_key = self.prefix(func).encode()
+        return (
+            func_key + self.ARGS_SEP.encode() + hashed_arguments
+            if hashed_arguments else func_key
+        )
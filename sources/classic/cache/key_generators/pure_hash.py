@@ -13,11 +13,9 @@ class PureHash(FuncKeyCreator):
 
     def hash_arguments(self, *args, **kwargs) -> Hashable | None:
 
-        # В боевых условиях надо вызывать с -OO для вырезания assert'ов
-        assert all(isinstance(arg, Hashable) for arg in args)
-        assert all(isinstance(value, Hashable) for value in kwargs.values())
-
-        kwargs = tuple(sorted(kwargs.items()))
+        # Отдельная проверка аргументов на Hashable не нужна (и дорога для
+        # горячего пути): hash() сам выбросит TypeError для нехэшируемых
+        kwargs = tuple(sorted(kwargs.items())) if kwargs else ()
 
         if args and kwargs:
             tuple_creation = args + kwargs
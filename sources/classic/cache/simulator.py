@@ -0,0 +1,436 @@
+"""
+Офлайн-симулятор нагрузки на кэш: воспроизводит трассу обращений к ключам
+через реализацию `Cache` (напрямую или через `@cached`) и собирает долю
+попаданий, занимаемую память, число операций с кэшем и перцентили задержек.
+
+Трассу можно сгенерировать (`zipf_trace`, `scan_trace`, `burst_trace`) или
+записать в боевом окружении хуком `BoundedWrapper.recorder`:
+
+>>> from classic.cache.decorator import BoundedWrapper
+>>> BoundedWrapper.recorder = TraceRecorder('trace.jsonl')
+
+и затем загрузить через `load_trace`. Сравнение конфигураций из командной
+строки: `python -m classic.cache.simulator --zipf 10000 --max-size 1000`.
+"""
+import argparse
+import itertools
+import random
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass, field
+from typing import IO, Any, Callable, Hashable, Iterable, Mapping, Type
+
+import msgspec
+
+from classic.components import component
+
+from .cache import Cache, Key, MemoryReport, Progress, Result, Value
+from .caches import InMemoryCache, LRU, WTinyLFU
+from .decorator import cached
+from .key_generator import FuncKeyCreator
+
+Trace = list[Hashable]
+
+
+def zipf_trace(
+    keys: int,
+    length: int,
+    skew: float = 1.0,
+    seed: int | None = None,
+) -> Trace:
+    """
+    Трасса с распределением Ципфа: ключ ранга r запрашивается с
+    вероятностью, пропорциональной 1 / r ** skew.
+    """
+    rnd = random.Random(seed)
+    weights = itertools.accumulate(
+        1 / rank ** skew for rank in range(1, keys + 1)
+    )
+    cum_weights = list(weights)
+    return rnd.choices(range(keys), cum_weights=cum_weights, k=length)
+
+
+def scan_trace(keys: int, length: int, start: int = 0) -> Trace:
+    """
+    Последовательное сканирование ключей `start..start+keys` по кругу.
+    """
+    return [start + index % keys for index in range(length)]
+
+
+def burst_trace(
+    keys: int,
+    length: int,
+    burst_keys: int = 10,
+    burst_length: int = 1000,
+    period: int = 10000,
+    skew: float = 1.0,
+    seed: int | None = None,
+) -> Trace:
+    """
+    Фон с распределением Ципфа, в который каждые `period` обращений
+    вклиниваются всплески: `burst_length` обращений к `burst_keys` новым
+    ключам, ранее не встречавшимся в трассе.
+    """
+    rnd = random.Random(seed)
+    trace = zipf_trace(keys, length, skew, seed)
+    next_key = keys
+
+    for start in range(period, length, period):
+        burst = range(next_key, next_key + burst_keys)
+        next_key += burst_keys
+        for index in range(start, min(start + burst_length, length)):
+            trace[index] = rnd.choice(burst)
+
+    return trace
+
+
+def mix_traces(*traces: Trace) -> Trace:
+    """
+    Склеивает трассы последовательно (например, фон и ночное сканирование).
+    """
+    return list(itertools.chain.from_iterable(traces))
+
+
+class TraceEvent(msgspec.Struct, array_like=True):
+    """
+    Событие трассы: время обращения, ключ и флаг попадания
+    """
+    ts: float
+    key: str
+    hit: bool
+
+
+class TraceRecorder:
+    """
+    Хук для `BoundedWrapper.recorder`: пишет обращения в файл в формате
+    JSON Lines. Ключи записываются строками (байтовые - в hex), так как
+    для воспроизведения важны только их равенство и частота.
+    """
+
+    def __init__(self, target: str | IO[bytes], sample_rate: float = 1.0):
+        """
+        :param target: путь к файлу или открытый бинарный файл
+        :param sample_rate: доля записываемых обращений (0..1]
+        """
+        self._owns_file = isinstance(target, str)
+        self.file = open(target, 'ab') if self._owns_file else target
+        self.sample_rate = sample_rate
+        self._encoder = msgspec.json.Encoder()
+        self._lock = threading.Lock()
+
+    def __call__(self, key: Key, hit: bool) -> None:
+        if self.sample_rate < 1 and random.random() >= self.sample_rate:
+            return
+
+        if isinstance(key, bytes):
+            key = key.hex()
+        elif not isinstance(key, str):
+            key = repr(key)
+
+        line = self._encoder.encode(TraceEvent(time.time(), key, hit))
+        with self._lock:
+            self.file.write(line + b'\n')
+
+    def close(self) -> None:
+        with self._lock:
+            self.file.flush()
+            if self._owns_file:
+                self.file.close()
+
+
+def load_trace(source: str | IO[bytes]) -> Trace:
+    """
+    Загружает ключи из трассы, записанной `TraceRecorder`.
+    """
+    decoder = msgspec.json.Decoder(TraceEvent)
+    if isinstance(source, str):
+        with open(source, 'rb') as file:
+            lines = file.readlines()
+    else:
+        lines = source.readlines()
+
+    return [decoder.decode(line).key for line in lines if line.strip()]
+
+
+@component
+class CountingCache(Cache):
+    """
+    Обертка над кэшем, подсчитывающая операции с ним и оценивающая объем
+    записанных данных (без учета вытеснения и истечения TTL)
+    """
+    cache: Cache
+    key_function: FuncKeyCreator | None = None
+    operations: Counter = field(default_factory=Counter)
+    sizes: dict[Key, int] = field(default_factory=dict)
+
+    def __post_init__(self):
+        if self.key_function is None:
+            self.key_function = self.cache.key_function
+
+    def set(
+        self,
+        key: Key,
+        value: Value,
+        ttl: int | None = None,
+    ) -> None:
+        self.operations['set'] += 1
+        self.sizes[key] = len(self._serialize(value))
+        self.cache.set(key, value, ttl)
+
+    def set_many(
+        self,
+        elements: Mapping[Key, Value],
+        ttl: int | None = None
+    ) -> None:
+        self.operations['set_many'] += 1
+        for key, value in elements.items():
+            self.sizes[key] = len(self._serialize(value))
+        self.cache.set_many(elements, ttl)
+
+    def exists(self, key: Key) -> bool:
+        self.operations['exists'] += 1
+        return self.cache.exists(key)
+
+    def exists_many(self, keys: Iterable[Key]) -> Mapping[Key, bool]:
+        self.operations['exists_many'] += 1
+        return self.cache.exists_many(keys)
+
+    def get(self, key: Key, cast_to: Type[Value]) -> Result:
+        self.operations['get'] += 1
+        return self.cache.get(key, cast_to)
+
+    def get_and_touch(
+        self,
+        key: Key,
+        cast_to: Type[Value],
+        ttl: int,
+    ) -> Result:
+        self.operations['get_and_touch'] += 1
+        return self.cache.get_and_touch(key, cast_to, ttl)
+
+    def touch(self, key: Key, ttl: int) -> None:
+        self.operations['touch'] += 1
+        self.cache.touch(key, ttl)
+
+    def get_many(self, keys: dict[Key, Type[Value]]) -> Mapping[Key, Result]:
+        self.operations['get_many'] += 1
+        return self.cache.get_many(keys)
+
+    def invalidate(self, key: Key) -> None:
+        self.operations['invalidate'] += 1
+        self.sizes.pop(key, None)
+        self.cache.invalidate(key)
+
+    def invalidate_all(self) -> None:
+        self.operations['invalidate_all'] += 1
+        self.sizes.clear()
+        self.cache.invalidate_all()
+
+    def invalidate_prefix(
+        self,
+        prefix: str | bytes,
+        batch_size: int = 1000,
+        progress: Progress | None = None,
+    ) -> int:
+        self.operations['invalidate_prefix'] += 1
+        for key in list(self.sizes):
+            if isinstance(key, type(prefix)) and key.startswith(prefix):
+                del self.sizes[key]
+        return self.cache.invalidate_prefix(prefix, batch_size, progress)
+
+    def memory_report(self, top: int = 10, **kwargs) -> MemoryReport:
+        self.operations['memory_report'] += 1
+        return self.cache.memory_report(top, **kwargs)
+
+    def acquire_lease(self, key: Key, ttl: float) -> Hashable | None:
+        self.operations['acquire_lease'] += 1
+        return self.cache.acquire_lease(key, ttl)
+
+    def release_lease(self, key: Key, token: Hashable) -> None:
+        self.operations['release_lease'] += 1
+        self.cache.release_lease(key, token)
+
+
+@dataclass
+class SimulationReport:
+    """
+    Результаты воспроизведения трассы для одной конфигурации кэша.
+    Задержки - в микросекундах, память - в байтах.
+    """
+    name: str
+    requests: int
+    hits: int
+    memory: int
+    operations: dict[str, int]
+    latency: dict[str, float]
+
+    @property
+    def hit_ratio(self) -> float:
+        return self.hits / self.requests if self.requests else 0.0
+
+
+def _percentiles(values: list[float]) -> dict[str, float]:
+    if not values:
+        return {}
+
+    values = sorted(values)
+    result = {}
+    for name, quantile in (('p50', 0.5), ('p90', 0.9), ('p99', 0.99)):
+        index = min(len(values) - 1, int(quantile * len(values)))
+        result[name] = values[index] * 1e6
+    result['max'] = values[-1] * 1e6
+    return result
+
+
+def _memory_footprint(cache: Cache, counting: CountingCache) -> int:
+    if isinstance(cache, InMemoryCache):
+        return sum(len(value) for __, value in cache.cache.values())
+
+    return sum(counting.sizes.values())
+
+
+def simulate(
+    cache: Cache,
+    trace: Iterable[Hashable],
+    name: str | None = None,
+    ttl: int | None = None,
+    value: Callable[[Hashable], Any] = lambda key: key,
+    use_decorator: bool = True,
+) -> SimulationReport:
+    """
+    Воспроизводит трассу через кэш и собирает метрики.
+    :param cache: исследуемая реализация кэша (будет изменена!)
+    :param trace: последовательность ключей (аргументов функции)
+    :param name: название конфигурации в отчете
+    :param ttl: время жизни элементов в секундах
+    :param value: функция, вычисляющая значение по ключу при промахе
+    :param use_decorator: воспроизводить через `@cached` (иначе - напрямую
+     через get/set интерфейса Cache)
+    """
+    counting = CountingCache(cache=cache)
+    requests = hits = 0
+    latencies = []
+
+    if use_decorator:
+        misses = Counter()
+
+        @component
+        class Replay:
+
+            @cached(ttl=ttl)
+            def load(self, key: Hashable) -> Any:
+                misses['count'] += 1
+                return value(key)
+
+        load = Replay(cache=counting).load
+        for key in trace:
+            started = time.perf_counter()
+            load(key)
+            latencies.append(time.perf_counter() - started)
+            requests += 1
+        hits = requests - misses['count']
+    else:
+        for key in trace:
+            started = time.perf_counter()
+            __, found = counting.get(key, Any)
+            if found:
+                hits += 1
+            else:
+                counting.set(key, value(key), ttl)
+            latencies.append(time.perf_counter() - started)
+            requests += 1
+
+    return SimulationReport(
+        name=name or type(cache).__name__,
+        requests=requests,
+        hits=hits,
+        memory=_memory_footprint(cache, counting),
+        operations=dict(counting.operations),
+        latency=_percentiles(latencies),
+    )
+
+
+def compare(
+    caches: Mapping[str, Cache],
+    trace: Trace,
+    **kwargs,
+) -> list[SimulationReport]:
+    """
+    Воспроизводит одну и ту же трассу через несколько конфигураций кэша.
+    :param caches: словарь название -> экземпляр кэша
+    :param kwargs: параметры `simulate`
+    """
+    return [
+        simulate(cache, trace, name=name, **kwargs)
+        for name, cache in caches.items()
+    ]
+
+
+def format_reports(reports: Iterable[SimulationReport]) -> str:
+    """
+    Форматирует отчеты в виде текстовой таблицы.
+    """
+    header = (
+        f'{"config":<24}{"hit ratio":>10}{"memory":>12}'
+        f'{"ops":>10}{"p50 us":>10}{"p99 us":>10}'
+    )
+    lines = [header, '-' * len(header)]
+    for report in reports:
+        lines.append(
+            f'{report.name:<24}{report.hit_ratio:>10.3f}'
+            f'{report.memory:>12}{sum(report.operations.values()):>10}'
+            f'{report.latency.get("p50", 0):>10.1f}'
+            f'{report.latency.get("p99", 0):>10.1f}'
+        )
+    return '\n'.join(lines)
+
+
+def main(argv: list[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(
+        description='Сравнение конфигураций кэша на трассе обращений'
+    )
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument('--trace', help='файл трассы TraceRecorder')
+    source.add_argument('--zipf', type=int, metavar='KEYS')
+    source.add_argument('--scan', type=int, metavar='KEYS')
+    source.add_argument('--burst', type=int, metavar='KEYS')
+    parser.add_argument('--length', type=int, default=100000)
+    parser.add_argument('--skew', type=float, default=1.0)
+    parser.add_argument('--max-size', type=int, default=1000)
+    parser.add_argument('--seed', type=int, default=None)
+    args = parser.parse_args(argv)
+
+    if args.trace:
+        trace = load_trace(args.trace)
+    elif args.zipf:
+        trace = zipf_trace(args.zipf, args.length, args.skew, args.seed)
+    elif args.scan:
+        trace = scan_trace(args.scan, args.length)
+    else:
+        trace = burst_trace(
+            args.burst, args.length, skew=args.skew, seed=args.seed
+        )
+
+    caches = {
+        'in_memory': InMemoryCache(),
+        f'in_memory lru({args.max_size})': InMemoryCache(
+            eviction=LRU(args.max_size)
+        ),
+        f'in_memory tinylfu({args.max_size})': InMemoryCache(
+            eviction=WTinyLFU(args.max_size)
+        ),
+    }
+    try:
+        from fakeredis import FakeRedis
+    except ImportError:
+        pass
+    else:
+        from .caches import RedisCache
+        caches['redis (fakeredis)'] = RedisCache(connection=FakeRedis())
+
+    print(format_reports(compare(caches, trace)))
+
+
+if __name__ == '__main__':
+    main()
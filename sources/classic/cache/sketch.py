@@ -0,0 +1,80 @@
+from typing import Hashable
+
+# Таблица для старения: делит пополам оба 4-битных счетчика в байте
+_HALVE = bytes(((byte >> 1) & 0x77) for byte in range(256))
+
+# Нечетные множители для получения независимых индексов в строках
+_SEEDS = (
+    0x9E3779B97F4A7C15,
+    0xC2B2AE3D27D4EB4F,
+    0x165667B19E3779F9,
+    0xD6E8FEB86659FD93,
+)
+_MASK64 = 0xFFFFFFFFFFFFFFFF
+
+
+class CountMinSketch:
+    """
+    Компактная оценка частоты ключей (count-min sketch) с 4-битными
+    счетчиками (по два в байте) и периодическим старением: после
+    `sample_size` добавлений все счетчики делятся пополам, так что
+    оценка отражает недавнюю, а не накопленную за все время частоту.
+    """
+
+    DEPTH = len(_SEEDS)
+    MAX_COUNTER = 15
+
+    def __init__(self, width: int, sample_size: int | None = None):
+        """
+        :param width: число счетчиков в строке (округляется вверх до степени
+         двойки), обычно порядка числа отслеживаемых ключей
+        :param sample_size: число добавлений между старениями
+         (по умолчанию 10 * width)
+        """
+        width = 1 << max(width - 1, 1).bit_length()
+        self.width = width
+        self.sample_size = sample_size or 10 * width
+        self.additions = 0
+        self._table = bytearray(self.DEPTH * width // 2)
+
+    @property
+    def nbytes(self) -> int:
+        return len(self._table)
+
+    def _indexes(self, key: Hashable) -> list[int]:
+        value = hash(key) & _MASK64
+        mask = self.width - 1
+        indexes = []
+        for row, seed in enumerate(_SEEDS):
+            mixed = (value * seed) & _MASK64
+            mixed ^= mixed >> 31
+            indexes.append(row * self.width + (mixed & mask))
+        return indexes
+
+    def _counter(self, index: int) -> int:
+        return (self._table[index >> 1] >> ((index & 1) << 2)) & 0xF
+
+    def increment(self, key: Hashable) -> None:
+        table = self._table
+        for index in self._indexes(key):
+            shift = (index & 1) << 2
+            if (table[index >> 1] >> shift) & 0xF < self.MAX_COUNTER:
+                table[index >> 1] += 1 << shift
+
+        self.additions += 1
+        if self.additions >= self.sample_size:
+            self.age()
+
+    def estimate(self, key: Hashable) -> int:
+        return min(self._counter(index) for index in self._indexes(key))
+
+    def age(self) -> None:
+        """
+        Делит все счетчики пополам
+        """
+        self._table = bytearray(self._table.translate(_HALVE))
+        self.additions //= 2
+
+    def clear(self) -> None:
+        self._table = bytearray(len(self._table))
+        self.additions = 0
@@ -0,0 +1,189 @@
+try:
+    from fakeredis import FakeRedis
+    redis_installed = True
+except ImportError:
+    FakeRedis = type('FakeRedis', (), {})
+    redis_installed = False
+
+import threading
+import time
+
+import pytest
+
+from classic.cache import BloomFilter, CountingBloomFilter, cached
+from classic.cache.caches import RedisCache
+from classic.components import component
+
+bloom_filters = [BloomFilter, CountingBloomFilter]
+
+
+@pytest.fixture(scope='function')
+def redis_connection():
+    return FakeRedis()
+
+
+@pytest.mark.parametrize('bloom_cls', bloom_filters)
+def test_no_false_negatives(bloom_cls):
+    bloom_filter = bloom_cls(capacity=1000)
+    items = [f'key_{index}'.encode() for index in range(1000)]
+
+    for item in items:
+        bloom_filter.add(item)
+
+    assert all(item in bloom_filter for item in items)
+
+
+@pytest.mark.parametrize('bloom_cls', bloom_filters)
+def test_false_positive_rate(bloom_cls):
+    bloom_filter = bloom_cls(capacity=1000, error_rate=0.01)
+    for index in range(1000):
+        bloom_filter.add(f'key_{index}'.encode())
+
+    false_positives = sum(
+        f'other_{index}'.encode() in bloom_filter for index in range(10000)
+    )
+    assert false_positives / 10000 < 0.03
+
+
+def test_memory_budget():
+    bloom_filter = BloomFilter(capacity=10 ** 6, error_rate=0.001)
+    limited = BloomFilter(capacity=10 ** 6, error_rate=0.001, max_bytes=1024)
+    counting = CountingBloomFilter(capacity=10 ** 6, max_bytes=1024)
+
+    assert bloom_filter.nbytes > 1024
+    assert limited.nbytes <= 1024
+    assert counting.nbytes <= 1024
+
+
+def test_counting_remove():
+    bloom_filter = CountingBloomFilter(capacity=100)
+    bloom_filter.add(b'first')
+    bloom_filter.add(b'second')
+
+    bloom_filter.remove(b'first')
+
+    assert b'first' not in bloom_filter
+    assert b'second' in bloom_filter
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+@pytest.mark.parametrize('bloom_cls', bloom_filters)
+def test_redis_cache_skips_absent_keys(redis_connection, bloom_cls):
+    cache = RedisCache(
+        connection=redis_connection, bloom_filter=bloom_cls(capacity=100)
+    )
+    cache.set('present', 1)
+    # запись другого узла: в локальный фильтр не попадает
+    RedisCache(connection=redis_connection).set('foreign', 2)
+
+    assert cache.get('present', int) == (1, True)
+    assert cache.get('foreign', int) == (None, False)
+    assert not cache.exists('foreign')
+    assert cache.get_many({'present': int, 'foreign': int}) == {
+        'present': (1, True),
+        'foreign': (None, False),
+    }
+
+    cache.rebuild_bloom_filter()
+    assert cache.get('foreign', int) == (2, True)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_redis_cache_invalidate_counting(redis_connection):
+    bloom_filter = CountingBloomFilter(capacity=100)
+    cache = RedisCache(connection=redis_connection, bloom_filter=bloom_filter)
+
+    cache.set_many({'first': 1, 'second': 2})
+    cache.invalidate('first')
+
+    assert cache.get('first', int) == (None, False)
+    assert cache.get('second', int) == (2, True)
+
+    cache.invalidate_all()
+    assert cache.get('second', int) == (None, False)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_redis_cache_counting_without_false_negatives(redis_connection):
+    bloom_filter = CountingBloomFilter(capacity=100)
+    cache = RedisCache(connection=redis_connection, bloom_filter=bloom_filter)
+    cache.set_many({'func:1': 1, 'func:2': 2})
+    RedisCache(connection=redis_connection).set('func:3', 3)
+
+    # повторная инвалидация и удаление по префиксу чужих ключей не
+    # уменьшают счетчики оставшихся ключей
+    cache.invalidate('func:1')
+    cache.invalidate('func:1')
+    cache.invalidate_prefix('func:')
+
+    cache.set('func:2', 2)
+    assert cache.get('func:2', int) == (2, True)
+    assert bloom_filter._cells.count(0) < len(bloom_filter._cells)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_redis_cache_rebuilds_on_start(redis_connection):
+    RedisCache(connection=redis_connection).set('foreign', 1)
+    cache = RedisCache(
+        connection=redis_connection,
+        bloom_filter=BloomFilter(capacity=100),
+        bloom_rebuild_interval=0.05,
+    )
+    assert cache.get('foreign', int) == (1, True)
+
+    RedisCache(connection=redis_connection).set('later', 2)
+    time.sleep(0.2)
+    cache.stop()
+    assert cache.get('later', int) == (2, True)
+
+
+@component
+class LeasedClass:
+    calls: int = 0
+
+    @cached(ttl=60, lease=5)
+    def some_method(self, arg: int) -> int:
+        self.calls += 1
+        time.sleep(0.05)
+        return arg
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_redis_cache_lease_with_bloom_filter(redis_connection):
+    # узлы с собственными фильтрами и общим Redis
+    instances = [
+        LeasedClass(cache=RedisCache(
+            connection=redis_connection,
+            bloom_filter=BloomFilter(capacity=100),
+        ))
+        for __ in range(2)
+    ]
+    first = threading.Thread(target=instances[0].some_method, args=(1,))
+    first.start()
+    time.sleep(0.01)
+
+    assert instances[1].some_method(1) == 1
+    first.join()
+    assert sum(instance.calls for instance in instances) == 1
+
+
+def test_rebuild_keeps_concurrent_additions():
+    bloom_filter = BloomFilter(capacity=100)
+
+    def items():
+        yield b'first'
+        # запись во время перестроения не теряется при подмене данных
+        bloom_filter.add(b'second')
+
+    bloom_filter.rebuild(items())
+    assert b'first' in bloom_filter and b'second' in bloom_filter
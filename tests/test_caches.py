@@ -5,14 +5,15 @@ except ImportError:
     FakeRedis = type('FakeRedis', (), {})
     redis_installed = False
 
+import time
 from dataclasses import dataclass
 from datetime import datetime
 
 import pytest
 from freezegun import freeze_time
 
-from classic.cache import Cache
-from classic.cache.caches import RedisCache, InMemoryCache
+from classic.cache import Cache, key_generators
+from classic.cache.caches import LRU, RedisCache, InMemoryCache
 
 
 @dataclass(frozen=True)
@@ -218,3 +219,397 @@ def test_serialize(request, key, expected):
         instance = request.getfixturevalue(cache)
         encoded_key = instance._serialize(key)
         assert isinstance(encoded_key, expected)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_lease_acquire_release_redis(redis_cache):
+    key = 'test'
+
+    token = redis_cache.acquire_lease(key, 10)
+    assert token is not None
+    assert redis_cache.acquire_lease(key, 10) is None
+
+    redis_cache.release_lease(key, token)
+    assert redis_cache.acquire_lease(key, 10) is not None
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_lease_release_foreign_token_redis(redis_cache):
+    key = 'test'
+
+    token = redis_cache.acquire_lease(key, 10)
+    redis_cache.release_lease(key, b'foreign')
+
+    assert redis_cache.acquire_lease(key, 10) is None
+    redis_cache.release_lease(key, token)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_lease_expired_redis(redis_cache):
+    key = 'test'
+
+    assert redis_cache.acquire_lease(key, 0.01) is not None
+    time.sleep(0.05)
+
+    assert redis_cache.acquire_lease(key, 10) is not None
+
+
+def test_lease_in_memory(in_memory_cache):
+    # без поддержки распределенных аренд вычисление всегда разрешено
+    assert in_memory_cache.acquire_lease('test', 10) is not None
+    assert in_memory_cache.acquire_lease('test', 10) is not None
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_compact_keys_redis():
+    connection = FakeRedis()
+    cache = RedisCache(
+        connection=connection,
+        compact_keys=True,
+        key_function=key_generators.Compact(),
+    )
+    key = cache.key_function(test_compact_keys_redis, 'x' * 1000)
+
+    cache.set(key, 1.0)
+
+    assert connection.keys() == [key]
+    assert cache.get(key, float) == (1.0, True)
+    assert cache.get_many({key: float, 'other': float}) == {
+        key: (1.0, True),
+        'other': (None, False),
+    }
+    cache.invalidate(key)
+    assert not cache.exists(key)
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_invalidate_prefix(cache_instance):
+    elements = {f'func:{index}': 1.0 for index in range(25)}
+    cache_instance.set_many(elements)
+    cache_instance.set('func', 1.0)
+    cache_instance.set('other:1', 1.0)
+
+    # fakeredis, в отличие от Redis, пропускает ключи, если удалять их
+    # между шагами SCAN, поэтому полный обход проверяем одной порцией
+    deleted = cache_instance.invalidate_prefix('func:')
+
+    assert deleted == 25
+    assert not any(cache_instance.exists(key) for key in elements)
+    assert cache_instance.exists('func')
+    assert cache_instance.exists('other:1')
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_invalidate_prefix_glob_characters(cache_instance):
+    cache_instance.set('f[1]*?:1', 1.0)
+    cache_instance.set('f1x:1', 1.0)
+
+    assert cache_instance.invalidate_prefix('f[1]*?:') == 1
+    assert not cache_instance.exists('f[1]*?:1')
+    assert cache_instance.exists('f1x:1')
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_invalidate_prefix_cancel(cache_instance):
+    cache_instance.set_many({f'func:{index}': 1.0 for index in range(100)})
+    reported = []
+
+    def progress(deleted: int) -> bool:
+        reported.append(deleted)
+        return False
+
+    deleted = cache_instance.invalidate_prefix(
+        'func:', batch_size=10, progress=progress
+    )
+
+    assert reported == [deleted]
+    assert 0 < deleted < 100
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_invalidate_prefix_compact_keys_redis():
+    cache = RedisCache(
+        connection=FakeRedis(),
+        compact_keys=True,
+        key_function=key_generators.Compact(),
+    )
+    keys = [cache.key_function(test_compact_keys_redis, index)
+            for index in range(10)]
+    cache.set_many(dict.fromkeys(keys, 1.0))
+
+    prefix = cache.key_function.prefix(test_compact_keys_redis).encode()
+
+    assert cache.invalidate_prefix(prefix) == 10
+    assert not any(cache.exists(key) for key in keys)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_chunked_values_redis():
+    connection = FakeRedis()
+    cache = RedisCache(connection=connection, chunk_size=1024)
+    large, small = 'x' * 10000, 'y'
+
+    cache.set('large', large, ttl=60)
+    cache.set('small', small)
+
+    # манифест, 10 частей и обычное значение
+    assert len(connection.keys()) == 12
+    assert connection.ttl(cache._encode_key('large')) > 0
+    assert cache.get('large', str) == (large, True)
+    assert cache.get_many({'large': str, 'small': str, 'other': str}) == {
+        'large': (large, True),
+        'small': (small, True),
+        'other': (None, False),
+    }
+
+    # части прежнего значения удаляются при перезаписи и инвалидации
+    cache.set('large', large * 2)
+    assert len(connection.keys()) == 22
+    assert cache.get('large', str) == (large * 2, True)
+
+    # и при перезаписи маленьким значением
+    cache.set('large', small)
+    assert len(connection.keys()) == 2
+    assert cache.get('large', str) == (small, True)
+
+    cache.set('large', large)
+    cache.invalidate('large')
+    assert connection.keys() == [cache._encode_key('small')]
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_chunked_value_lost_part_redis():
+    connection = FakeRedis()
+    cache = RedisCache(connection=connection, chunk_size=1024)
+    cache.set_many({'first': 'x' * 5000, 'second': 'y' * 5000})
+
+    part_key = next(key for key in connection.keys() if b'chunk:' in key)
+    connection.delete(part_key)
+
+    results = cache.get_many({'first': str, 'second': str})
+    assert sorted(found for __, found in results.values()) == [False, True]
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_exists_many(cache_instance):
+    cache_instance.set_many({'first': 1, 'second': 2})
+
+    assert cache_instance.exists_many(['first', 'second', 'third']) == {
+        'first': True,
+        'second': True,
+        'third': False,
+    }
+
+
+def first_function():
+    ...
+
+
+def second_function():
+    ...
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_memory_report(cache_instance):
+    key_function = cache_instance.key_function
+    for index in range(3):
+        cache_instance.set(key_function(first_function, index), 'x' * 10)
+    large_key = key_function(second_function, 1)
+    cache_instance.set(large_key, 'x' * 1000)
+    cache_instance.set(key_function(second_function, 2), 'x')
+    cache_instance.invalidate(key_function(second_function, 2))
+
+    report = cache_instance.memory_report(top=1)
+
+    first = report.functions[key_function.prefix(first_function)]
+    second = report.functions[key_function.prefix(second_function)]
+    assert first.entries == 3 and second.entries == 1
+    assert second.bytes > first.bytes > 0
+    assert len(report.largest) == 1
+    assert report.largest[0][1] >= 1000
+
+
+def test_memory_report_expired(in_memory_cache, next_year):
+    key_function = in_memory_cache.key_function
+    in_memory_cache.set(key_function(first_function, 1), 1, ttl=60)
+    in_memory_cache.set(key_function(first_function, 2), 1)
+
+    with freeze_time(next_year):
+        report = in_memory_cache.memory_report()
+
+    footprint = report.functions[key_function.prefix(first_function)]
+    assert (footprint.entries, footprint.expired) == (2, 1)
+
+
+def test_memory_report_overwrite(in_memory_cache):
+    cache = in_memory_cache
+    key = cache.key_function(first_function, 1)
+
+    cache.set(key, 'x' * 100)
+    cache.set(key, 'x')
+
+    footprint = cache.memory_report().functions[
+        cache.key_function.prefix(first_function)
+    ]
+    assert (footprint.entries, footprint.bytes) == (1, 3)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_memory_report_sample_redis(redis_cache):
+    key_function = redis_cache.key_function
+    redis_cache.set_many(
+        {key_function(first_function, index): 1 for index in range(50)}
+    )
+    redis_cache.acquire_lease(key_function(first_function, 1), 10)
+
+    full = redis_cache.memory_report(batch_size=10)
+    sample = redis_cache.memory_report(sample_size=20, batch_size=10)
+
+    prefix = key_function.prefix(first_function)
+    assert full.functions[prefix].entries == 51
+    assert sample.functions[prefix].entries == 20
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_memory_report_without_arguments_redis():
+    cache = RedisCache(connection=FakeRedis(), chunk_size=1024)
+    key_function = cache.key_function
+    cache.set(key_function(first_function), 'x' * 5000)
+    cache.set(key_function(first_function, 1), 1)
+
+    # ключ без аргументов и части значения - в одной группе с остальными
+    report = cache.memory_report()
+    assert list(report.functions) == [key_function.prefix(first_function)]
+    assert report.functions[key_function.prefix(first_function)].entries == 7
+
+
+def test_memory_report_counters_with_eviction():
+    cache = InMemoryCache(eviction=LRU(max_size=2))
+    key_function = cache.key_function
+    for index in range(3):
+        cache.set(key_function(first_function, index), 'x' * 10)
+    cache.set(key_function(second_function, 1), 'x')
+    cache.invalidate(key_function(second_function, 1))
+
+    report = cache.memory_report()
+    assert list(report.functions) == [key_function.prefix(first_function)]
+    assert report.functions[key_function.prefix(first_function)].entries == 1
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_get_and_touch(cache_instance):
+    with freeze_time(datetime.now()) as frozen_time:
+        cache_instance.set('test', 1, ttl=10)
+        cache_instance.set('other', 2, ttl=10)
+
+        for __ in range(3):
+            frozen_time.tick(6)
+            assert cache_instance.get_and_touch('test', int, 10) == (1, True)
+
+        assert cache_instance.get('test', int) == (1, True)
+        assert cache_instance.get('other', int) == (None, False)
+        assert cache_instance.get_and_touch('other', int, 10) == (None, False)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_get_and_touch_chunked_redis():
+    cache = RedisCache(connection=FakeRedis(), chunk_size=1024)
+    value = 'x' * 5000
+
+    with freeze_time(datetime.now()) as frozen_time:
+        cache.set('test', value, ttl=10)
+        for __ in range(3):
+            frozen_time.tick(6)
+            assert cache.get_and_touch('test', str, 10) == (value, True)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_touch_batched_redis():
+    connection = FakeRedis()
+    cache = RedisCache(connection=connection, touch_batch_size=3)
+    cache.set_many({f'test_{index}': index for index in range(3)}, ttl=10)
+
+    cache.touch('test_0', 100)
+    cache.touch('test_1', 100)
+    # продления накапливаются до заполнения пакета
+    assert connection.ttl(cache._encode_key('test_0')) <= 10
+
+    cache.touch('test_2', 100)
+    for index in range(3):
+        assert connection.ttl(cache._encode_key(f'test_{index}')) > 10
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_touch_flushed_by_timer_redis():
+    connection = FakeRedis()
+    cache = RedisCache(connection=connection, touch_interval=0.05)
+    cache.set('test', 1, ttl=10)
+
+    # неполный пакет отправляется таймером без следующих продлений
+    cache.touch('test', 100)
+    time.sleep(0.2)
+    assert connection.ttl(cache._encode_key('test')) > 10
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_touch_chunked_redis():
+    connection = FakeRedis()
+    cache = RedisCache(connection=connection, chunk_size=1024)
+    cache.set('test', 'x' * 5000, ttl=10)
+
+    cache.touch('test', 100)
+    cache.flush_touches()
+    assert all(connection.ttl(key) > 10 for key in connection.keys())
+
+
+def test_touch_does_not_restore_overwritten(in_memory_cache):
+    in_memory_cache.set('test', 1, ttl=10)
+    cached_value = in_memory_cache.cache['test']
+
+    # запись перезаписана после чтения продлевающим: ее не возвращаем
+    in_memory_cache.set('test', 2)
+    in_memory_cache._extend('test', cached_value, 100)
+    assert in_memory_cache.get('test', int) == (2, True)
+
+    in_memory_cache.invalidate('test')
+    in_memory_cache._extend('test', cached_value, 100)
+    assert 'test' not in in_memory_cache.cache
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_touch_does_not_restore_expired(cache_instance):
+    with freeze_time(datetime.now()) as frozen_time:
+        cache_instance.set('test', 1, ttl=5)
+        frozen_time.tick(10)
+
+        cache_instance.touch('test', 100)
+        if isinstance(cache_instance, RedisCache):
+            cache_instance.flush_touches()
+
+        assert cache_instance.get('test', int) == (None, False)
@@ -5,12 +5,27 @@ except ImportError:
     FakeRedis = type('FakeRedis', (), {})
     redis_installed = False
 
+import copy
+import logging
+import pickle
+import sys
+import threading
+import time
+import timeit
+from datetime import datetime
+from typing import Iterator
+
 import pytest
+from freezegun import freeze_time
 
-from classic.cache import cached, Cache
+from classic.cache import AdaptiveState, cached, Cache, simulator
 from classic.components import component
 
 from classic.cache.caches import RedisCache, InMemoryCache
+from classic.cache import decorator
+from classic.cache.decorator import CachedError
+
+logger = logging.getLogger(__name__)
 
 
 @component
@@ -61,6 +76,23 @@ def test_invalidate(cache_instance):
     assert not found
 
 
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_invalidate_all(cache_instance):
+    some_instance = SomeClass(cache=cache_instance)
+    for arg in range(20):
+        some_instance.some_method(arg, 0)
+    other_key = cache_instance.key_function(test_invalidate_all, 1)
+    cache_instance.set(other_key, 1)
+
+    deleted = some_instance.some_method.invalidate_all()
+
+    assert deleted == 20
+    for arg in range(20):
+        fn_key = cache_instance.key_function(SomeClass.some_method, arg, 0)
+        assert not cache_instance.exists(fn_key)
+    assert cache_instance.exists(other_key)
+
+
 @pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
 def test_refresh(cache_instance):
     some_instance = SomeClass(cache=cache_instance)
@@ -69,3 +101,548 @@ def test_refresh(cache_instance):
     fn_key = cache_instance.key_function(SomeClass.some_method, 1, 2)
     __, found = cache_instance.get(fn_key, int)
     assert found
+
+
+@component
+class LeasedClass:
+    calls: int = 0
+
+    @cached(ttl=60, lease=5)
+    def some_method(self, arg1: int, arg2: int) -> int:
+        self.calls += 1
+        return arg1 + arg2
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_lease_waits_for_holder(redis_cache):
+    some_instance = LeasedClass(cache=redis_cache)
+    fn_key = redis_cache.key_function(LeasedClass.some_method, 1, 2)
+
+    # другой узел уже вычисляет значение и запишет его чуть позже
+    token = redis_cache.acquire_lease(fn_key, 5)
+
+    def holder():
+        time.sleep(0.05)
+        redis_cache.set(fn_key, 100, 60)
+        redis_cache.release_lease(fn_key, token)
+
+    thread = threading.Thread(target=holder)
+    thread.start()
+    result = some_instance.some_method(1, 2)
+    thread.join()
+
+    assert result == 100
+    assert some_instance.calls == 0
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_lease_expired_holder(redis_cache):
+    some_instance = LeasedClass(cache=redis_cache)
+    fn_key = redis_cache.key_function(LeasedClass.some_method, 1, 2)
+
+    # владелец аренды "упал" и никогда не запишет значение
+    redis_cache.acquire_lease(fn_key, 0.05)
+
+    assert some_instance.some_method(1, 2) == 3
+    assert some_instance.calls == 1
+    __, found = redis_cache.get(fn_key, int)
+    assert found
+
+
+@component
+class SlowLeasedClass:
+    calls: int = 0
+
+    @cached(ttl=60, lease=5)
+    def some_method(self, arg1: int, arg2: int) -> int:
+        self.calls += 1
+        time.sleep(0.05)
+        return arg1 + arg2
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_lease_concurrent_callers(redis_cache):
+    # экземпляры на разных "узлах" с общим Redis
+    instances = [SlowLeasedClass(cache=redis_cache) for __ in range(5)]
+    results = []
+
+    threads = [
+        threading.Thread(
+            target=lambda obj: results.append(obj.some_method(1, 2)),
+            args=(instance,),
+        )
+        for instance in instances
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == [3] * 5
+    assert sum(instance.calls for instance in instances) == 1
+
+
+class UpstreamError(Exception):
+    ...
+
+
+@component
+class NegativeClass:
+    calls: int = 0
+
+    @cached(
+        ttl=60,
+        negative_ttl=5,
+        cache_exceptions=(UpstreamError,),
+        error_ttl=1,
+    )
+    def find(self, arg: int) -> int | None:
+        self.calls += 1
+        if arg < 0:
+            raise UpstreamError('upstream failed', arg)
+        if arg == 0:
+            raise ValueError(arg)
+        return arg if arg % 2 else None
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_negative_result_cached(cache_instance):
+    some_instance = NegativeClass(cache=cache_instance)
+
+    assert some_instance.find(2) is None
+    assert some_instance.find(2) is None
+    assert some_instance.find(3) == 3
+    assert some_instance.find(3) == 3
+
+    assert some_instance.calls == 2
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_exception_cached(cache_instance):
+    some_instance = NegativeClass(cache=cache_instance)
+
+    for __ in range(3):
+        with pytest.raises(UpstreamError) as error:
+            some_instance.find(-1)
+        assert error.value.args == ('upstream failed', -1)
+
+    assert some_instance.calls == 1
+
+
+class UpstreamTimeout(UpstreamError):
+    ...
+
+
+def test_cached_error_restore_without_imports():
+    error = CachedError.from_exception(UpstreamTimeout('timeout'))
+    restored = error.restore((UpstreamError,))
+    assert isinstance(restored, UpstreamTimeout)
+    assert restored.args == ('timeout',)
+
+    # имя модуля из кэша не импортируется
+    forged = CachedError('antigravity:UpstreamError', ())
+    assert forged.restore((UpstreamError,)) is None
+    assert 'antigravity' not in sys.modules
+    assert CachedError(error.type, ()).restore((ValueError,)) is None
+
+
+def test_cached_error_lookup_memoized():
+    forged = CachedError('tests:Missing', ())
+    forged.restore((Exception,))
+    hits = decorator._find_subclass.cache_info().hits
+
+    # повторное восстановление не обходит дерево подклассов
+    assert forged.restore((Exception,)) is None
+    assert decorator._find_subclass.cache_info().hits == hits + 1
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_not_whitelisted_exception_not_cached(cache_instance):
+    some_instance = NegativeClass(cache=cache_instance)
+
+    for __ in range(2):
+        with pytest.raises(ValueError):
+            some_instance.find(0)
+
+    assert some_instance.calls == 2
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_refresh_many(cache_instance):
+    some_instance = SomeClass(cache=cache_instance)
+    arg_list = [(arg, 1) for arg in range(250)]
+
+    results = some_instance.some_method.refresh_many(
+        arg_list, max_workers=4, batch_size=64
+    )
+
+    assert [item.args for item in results] == arg_list
+    assert all(item.refreshed and item.error is None for item in results)
+    for arg, __ in arg_list:
+        fn_key = cache_instance.key_function(SomeClass.some_method, arg, 1)
+        assert cache_instance.get(fn_key, int) == (arg + 1, True)
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_refresh_many_failures(cache_instance):
+    some_instance = NegativeClass(cache=cache_instance)
+
+    results = some_instance.find.refresh_many([1, 2, 0, -1])
+
+    assert [item.refreshed for item in results] == [True, True, False, False]
+    assert isinstance(results[2].error, ValueError)
+    assert isinstance(results[3].error, UpstreamError)
+    # закэшированное исключение выбрасывается без повторного вычисления
+    with pytest.raises(UpstreamError):
+        some_instance.find(-1)
+    assert some_instance.find(1) == 1
+    assert some_instance.calls == 4
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_refresh_many_only_existing(cache_instance):
+    some_instance = SomeClass(cache=cache_instance)
+    some_instance.some_method(1, 1)
+
+    results = some_instance.some_method.refresh_many(
+        [(1, 1), (2, 1)], only_existing=True
+    )
+
+    assert [item.refreshed for item in results] == [True, False]
+    fn_key = cache_instance.key_function(SomeClass.some_method, 2, 1)
+    assert not cache_instance.exists(fn_key)
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_negative_and_error_ttl(cache_instance):
+    some_instance = NegativeClass(cache=cache_instance)
+
+    with freeze_time(datetime.now()) as frozen_time:
+        some_instance.find(3)
+        some_instance.find(2)
+        with pytest.raises(UpstreamError):
+            some_instance.find(-1)
+
+        # ошибка и None уже истекли, обычный результат - еще нет
+        frozen_time.tick(10)
+        some_instance.find(3)
+        some_instance.find(2)
+        with pytest.raises(UpstreamError):
+            some_instance.find(-1)
+
+    assert some_instance.calls == 5
+
+
+@component
+class AdaptiveClass:
+
+    @cached(adaptive=True)
+    def cheap(self, arg: int) -> int:
+        return arg
+
+    @cached(adaptive=True)
+    def expensive(self, arg: int) -> int:
+        time.sleep(0.001)
+        return arg
+
+
+def test_adaptive_bypasses_cheap_function(in_memory_cache):
+    some_instance = AdaptiveClass(cache=in_memory_cache)
+    state = AdaptiveClass.cheap.adaptive
+
+    for arg in range(state.min_samples):
+        some_instance.cheap(arg)
+    assert not state.caching
+
+    # в обход кэша, кроме периодической проверки
+    in_memory_cache.invalidate_all()
+    for arg in range(state.probe_interval - 1):
+        assert some_instance.cheap(arg) == arg
+    assert not in_memory_cache.cache
+
+    some_instance.cheap(0)
+    assert len(in_memory_cache.cache) == 1
+
+
+def test_adaptive_estimates_reuse_while_bypassing(in_memory_cache):
+    some_instance = AdaptiveClass(cache=in_memory_cache)
+    state = AdaptiveClass.cheap.adaptive
+
+    for arg in range(state.min_samples):
+        some_instance.cheap(arg)
+    assert not state.caching
+
+    # доля попаданий отражает повторы ключей (по выборке вызовов),
+    # а не редкие записи проверок
+    calls = 50 * state.reuse_interval
+    for arg in range(calls):
+        some_instance.cheap(1000 + arg)
+    assert state.hit_ratio < 0.1
+
+    for arg in range(calls):
+        some_instance.cheap(arg % 5)
+    assert state.hit_ratio > 0.9
+
+
+def test_adaptive_counts_bypass_overhead():
+    state = AdaptiveState(min_samples=1, smoothing=1)
+    state.record_compute(1.0)
+    state.record_lookup(2.0, False)
+    state.record_miss(2.0)
+    assert not state.caching
+
+    # обход кэша обходится дороже обращения к нему
+    state.record_bypass(1.0, 5.0)
+    state.record_lookup(2.0, True)
+    assert state.caching
+
+
+def test_adaptive_bypass_cheaper_than_cache(in_memory_cache):
+    some_instance = AdaptiveClass(cache=in_memory_cache)
+    state = AdaptiveClass.cheap.adaptive
+    for arg in range(state.min_samples):
+        some_instance.cheap(arg)
+    assert not state.caching
+    assert state.bypass_overhead is not None
+
+    cached_instance = SomeClass(cache=in_memory_cache)
+    cached_instance.some_method(1, 2)
+
+    num_trials = 10000
+    bypass = min(timeit.Timer(
+        lambda: some_instance.cheap(1)
+    ).repeat(5, num_trials))
+    cached_hit = min(timeit.Timer(
+        lambda: cached_instance.some_method(1, 2)
+    ).repeat(5, num_trials))
+
+    logger.info(
+        f"Per-call time: adaptive bypass {bypass / num_trials * 1e9:.0f} ns, "
+        f"cached hit {cached_hit / num_trials * 1e9:.0f} ns"
+    )
+    assert bypass < cached_hit
+
+
+def test_adaptive_keeps_caching_expensive_function(in_memory_cache):
+    some_instance = AdaptiveClass(cache=in_memory_cache)
+    state = AdaptiveClass.expensive.adaptive
+
+    for __ in range(50):
+        some_instance.expensive(1)
+
+    assert state.caching
+    assert state.hit_ratio > 0.9
+    assert state.cached_cost < state.compute_cost
+
+
+@component
+class StreamingClass:
+    calls: int = 0
+
+    @cached(ttl=60, segment_size=10)
+    def numbers(self, count: int) -> Iterator[int]:
+        self.calls += 1
+        for number in range(count):
+            yield number
+
+    @cached(segment_size=10)
+    def failing(self, count: int) -> Iterator[int]:
+        yield from range(count)
+        raise ValueError(count)
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_generator_cached(cache_instance):
+    some_instance = StreamingClass(cache=cache_instance)
+
+    assert list(some_instance.numbers(95)) == list(range(95))
+    assert list(some_instance.numbers(95)) == list(range(95))
+    assert list(some_instance.numbers(0)) == []
+    assert list(some_instance.numbers(0)) == []
+
+    assert some_instance.calls == 2
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_generator_partial_not_cached(cache_instance):
+    some_instance = StreamingClass(cache=cache_instance)
+
+    numbers = some_instance.numbers(95)
+    assert [next(numbers) for __ in range(15)] == list(range(15))
+    numbers.close()
+
+    assert list(some_instance.numbers(95)) == list(range(95))
+    assert some_instance.calls == 2
+
+
+def test_generator_partial_segments_removed(in_memory_cache):
+    some_instance = StreamingClass(cache=in_memory_cache)
+
+    numbers = some_instance.numbers(95)
+    assert [next(numbers) for __ in range(35)] == list(range(35))
+    assert in_memory_cache.cache
+    numbers.close()
+    assert not in_memory_cache.cache
+
+    with pytest.raises(ValueError):
+        list(some_instance.failing(25))
+    assert not in_memory_cache.cache
+
+
+def test_generator_replaced_segments_removed(in_memory_cache):
+    some_instance = StreamingClass(cache=in_memory_cache)
+
+    # одновременные промахи: результат второго замещает результат первого
+    first, second = some_instance.numbers(25), some_instance.numbers(25)
+    assert next(first) == next(second) == 0
+    list(first)
+    list(second)
+    some_instance.numbers.refresh(25)
+
+    # запись о результате и 3 сегмента последней записи
+    assert len(in_memory_cache.cache) == 4
+    assert list(some_instance.numbers(25)) == list(range(25))
+    assert some_instance.calls == 3
+
+
+def test_generator_hit_is_lazy(in_memory_cache):
+    cache = simulator.CountingCache(cache=in_memory_cache)
+    some_instance = StreamingClass(cache=cache)
+    list(some_instance.numbers(95))
+    cache.operations.clear()
+
+    numbers = some_instance.numbers(95)
+    assert next(numbers) == 0
+    assert cache.operations['get_many'] == 1
+
+    assert list(numbers) == list(range(1, 95))
+    assert cache.operations['get_many'] == 3
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_generator_invalidate_and_refresh(cache_instance):
+    some_instance = StreamingClass(cache=cache_instance)
+    list(some_instance.numbers(25))
+
+    some_instance.numbers.refresh(25)
+    some_instance.numbers.invalidate(25)
+
+    assert some_instance.numbers.invalidate_all() == 0
+    assert list(some_instance.numbers(25)) == list(range(25))
+    assert some_instance.calls == 3
+
+
+def test_generator_lost_segment(in_memory_cache):
+    some_instance = StreamingClass(cache=in_memory_cache)
+    list(some_instance.numbers(25))
+    segment_key = next(
+        key for key in in_memory_cache.cache if key.endswith(':1')
+    )
+    in_memory_cache.invalidate(segment_key)
+
+    assert list(some_instance.numbers(25)) == list(range(25))
+    # неполный результат удален вместе с оставшимися сегментами
+    assert not in_memory_cache.cache
+    assert list(some_instance.numbers(25)) == list(range(25))
+    assert some_instance.calls == 3
+
+
+@component
+class SlidingClass:
+    calls: int = 0
+
+    @cached(ttl=10, sliding=True)
+    def session(self, arg: int) -> int:
+        self.calls += 1
+        return arg
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_sliding_expiration(cache_instance):
+    some_instance = SlidingClass(cache=cache_instance)
+
+    with freeze_time(datetime.now()) as frozen_time:
+        some_instance.session(1)
+        for __ in range(3):
+            frozen_time.tick(6)
+            assert some_instance.session(1) == 1
+        assert some_instance.calls == 1
+
+        # без обращений результат истекает через ttl
+        frozen_time.tick(11)
+        some_instance.session(1)
+        assert some_instance.calls == 2
+
+
+@pytest.mark.parametrize('cache_instance', cache_instances, indirect=True)
+def test_bound_wrapper_reused(cache_instance):
+    some_instance = SomeClass(cache=cache_instance)
+
+    assert some_instance.some_method is some_instance.some_method
+
+
+def test_bound_wrapper_follows_cache(in_memory_cache):
+    some_instance = SomeClass(cache=in_memory_cache)
+    some_instance.some_method(1, 2)
+
+    other_cache = InMemoryCache()
+    some_instance.cache = other_cache
+    some_instance.some_method(1, 2)
+
+    fn_key = other_cache.key_function(SomeClass.some_method, 1, 2)
+    assert other_cache.get(fn_key, int) == (3, True)
+
+
+def test_bound_wrapper_copied_instance(in_memory_cache):
+    some_instance = LeasedClass(cache=in_memory_cache)
+    some_instance.some_method(1, 2)
+
+    copied = copy.copy(some_instance)
+    copied.some_method.refresh(1, 2)
+
+    assert some_instance.calls == 1 and copied.calls == 2
+
+
+def test_bound_wrapper_pickled_instance(in_memory_cache):
+    some_instance = SomeClass(cache=in_memory_cache)
+    some_instance.some_method(1, 2)
+
+    # обертка не попадает в состояние экземпляра
+    for restored in (
+        pickle.loads(pickle.dumps(some_instance)),
+        copy.deepcopy(some_instance),
+    ):
+        assert restored.some_method(1, 2) == 3
+        assert restored.some_method.instance is restored
+        assert restored.some_method.cache is restored.cache
+
+
+def test_call_overhead(in_memory_cache):
+    some_instance = SomeClass(cache=in_memory_cache)
+    undecorated = SomeClass.some_method.func
+    some_instance.some_method(1, 2)
+
+    num_trials = 100000
+    baseline = timeit.Timer(
+        lambda: undecorated(some_instance, 1, 2)
+    ).timeit(num_trials)
+    access = timeit.Timer(lambda: some_instance.some_method).timeit(num_trials)
+    cached_call = timeit.Timer(
+        lambda: some_instance.some_method(1, 2)
+    ).timeit(num_trials)
+
+    logger.info(
+        (
+            f"Per-call time for {num_trials} trials: "
+            f"undecorated {baseline / num_trials * 1e9:.0f} ns, "
+            f"bound method access {access / num_trials * 1e9:.0f} ns, "
+            f"cached hit {cached_call / num_trials * 1e9:.0f} ns "
+            f"(overhead {(cached_call - baseline) / num_trials * 1e9:.0f} ns)"
+        )
+    )
@@ -0,0 +1,128 @@
+import copy
+import pickle
+import random
+
+import pytest
+
+from classic.cache.caches import InMemoryCache, LRU, WTinyLFU
+from classic.cache.sketch import CountMinSketch
+
+policies = [LRU, WTinyLFU]
+
+
+def zipf_trace(keys: int, length: int, skew: float = 1.0, seed: int = 0):
+    rnd = random.Random(seed)
+    weights = [1 / (rank ** skew) for rank in range(1, keys + 1)]
+    return rnd.choices(range(keys), weights=weights, k=length)
+
+
+def hit_ratio(cache: InMemoryCache, trace) -> float:
+    hits = 0
+    for key in trace:
+        __, found = cache.get(key, int)
+        if found:
+            hits += 1
+        else:
+            cache.set(key, key)
+    return hits / len(trace)
+
+
+@pytest.mark.parametrize('policy', policies)
+def test_size_bounded(policy):
+    cache = InMemoryCache(eviction=policy(max_size=100))
+
+    for key in range(1000):
+        cache.set(key, key)
+
+    assert len(cache.cache) <= 100
+
+
+@pytest.mark.parametrize('policy', policies)
+def test_invalidate(policy):
+    cache = InMemoryCache(eviction=policy(max_size=10))
+    cache.set('test', 1)
+
+    cache.invalidate('test')
+    assert cache.get('test', int) == (None, False)
+
+    cache.set('test', 2)
+    assert cache.get('test', int) == (2, True)
+
+    cache.invalidate_all()
+    assert not cache.cache
+
+
+def test_lru_evicts_least_recent():
+    cache = InMemoryCache(eviction=LRU(max_size=2))
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a', int)
+
+    cache.set('c', 3)
+
+    assert cache.exists('a') and cache.exists('c')
+    assert not cache.exists('b')
+
+
+@pytest.mark.parametrize('policy', [None, *policies])
+def test_copy_and_pickle(policy):
+    cache = InMemoryCache(eviction=policy and policy(max_size=10))
+    cache.set('a', 1)
+
+    for restored in (copy.deepcopy(cache), pickle.loads(pickle.dumps(cache))):
+        assert restored.get('a', int) == (1, True)
+        assert restored._lock is not cache._lock
+        restored.set('b', 2)
+        assert not cache.exists('b')
+
+
+def test_tinylfu_resists_scan():
+    cache = InMemoryCache(eviction=WTinyLFU(max_size=100))
+    hot_keys = [f'hot_{index}' for index in range(50)]
+
+    for __ in range(5):
+        for key in hot_keys:
+            if not cache.get(key, int)[1]:
+                cache.set(key, 1)
+
+    # однократное сканирование не должно вытеснить частые ключи
+    for index in range(10000):
+        cache.set(f'scan_{index}', 1)
+
+    assert sum(cache.exists(key) for key in hot_keys) >= 45
+
+
+def test_tinylfu_hit_ratio():
+    trace = zipf_trace(keys=5000, length=30000)
+    # пакетные сканирования по редким ключам
+    scans = [10000 + index for index in range(2000)]
+    trace = trace[:10000] + scans + trace[10000:20000] + scans + trace[20000:]
+
+    lru = hit_ratio(InMemoryCache(eviction=LRU(max_size=200)), trace)
+    tinylfu = hit_ratio(InMemoryCache(eviction=WTinyLFU(max_size=200)), trace)
+
+    assert tinylfu > lru
+
+
+def test_sketch_estimate_and_aging():
+    sketch = CountMinSketch(width=64, sample_size=1000)
+
+    for __ in range(10):
+        sketch.increment('frequent')
+    sketch.increment('rare')
+
+    assert sketch.estimate('frequent') >= 10
+    assert sketch.estimate('rare') >= 1
+    assert sketch.estimate('frequent') > sketch.estimate('rare')
+
+    sketch.age()
+    assert sketch.estimate('frequent') == 5
+
+
+def test_sketch_saturation():
+    sketch = CountMinSketch(width=64)
+
+    for __ in range(100):
+        sketch.increment('key')
+
+    assert sketch.estimate('key') == CountMinSketch.MAX_COUNTER
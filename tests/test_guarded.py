@@ -0,0 +1,219 @@
+try:
+    from fakeredis import FakeRedis, FakeServer
+    redis_installed = True
+except ImportError:
+    FakeRedis = FakeServer = type('FakeRedis', (), {})
+    redis_installed = False
+
+import time
+
+import pytest
+
+from classic.cache import cached
+from classic.cache.caches import (
+    CircuitBreaker, GuardedCache, InMemoryCache, RedisCache,
+)
+from classic.components import component
+
+
+class SlowCache(InMemoryCache):
+    delay = 0.0
+
+    def get(self, key, cast_to):
+        time.sleep(self.delay)
+        return super().get(key, cast_to)
+
+
+@component
+class SomeClass:
+    calls: int = 0
+
+    @cached(ttl=60)
+    def some_method(self, arg1: int, arg2: int) -> int:
+        self.calls += 1
+        return arg1 + arg2
+
+
+@pytest.fixture(scope='function')
+def redis_server():
+    return FakeServer()
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_broken_cache_is_miss(redis_server):
+    redis_cache = RedisCache(connection=FakeRedis(server=redis_server))
+    cache = GuardedCache(cache=redis_cache)
+    cache.set('test', 1)
+
+    redis_server.connected = False
+
+    assert cache.get('test', int) == (None, False)
+    assert cache.get_many({'test': int}) == {'test': (None, False)}
+    assert not cache.exists('test')
+    cache.set('test', 2)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_breaker_opens_and_recovers(redis_server):
+    redis_cache = RedisCache(connection=FakeRedis(server=redis_server))
+    breaker = CircuitBreaker(failure_threshold=2, recovery_timeout=0.05)
+    cache = GuardedCache(cache=redis_cache, breaker=breaker)
+    cache.set('test', 1)
+
+    redis_server.connected = False
+    cache.get('test', int)
+    cache.get('test', int)
+    assert breaker.state == CircuitBreaker.OPEN
+
+    # пока выключатель разомкнут, кэш не вызывается вовсе
+    redis_server.connected = True
+    assert cache.get('test', int) == (None, False)
+
+    time.sleep(0.06)
+    assert breaker.state == CircuitBreaker.HALF_OPEN
+    assert cache.get('test', int) == (1, True)
+    assert breaker.state == CircuitBreaker.CLOSED
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_failed_half_open_probe(redis_server):
+    redis_cache = RedisCache(connection=FakeRedis(server=redis_server))
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    cache = GuardedCache(cache=redis_cache, breaker=breaker)
+
+    redis_server.connected = False
+    cache.get('test', int)
+    time.sleep(0.06)
+    cache.get('test', int)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_invalidations_replayed(redis_server):
+    redis_cache = RedisCache(connection=FakeRedis(server=redis_server))
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    cache = GuardedCache(cache=redis_cache, breaker=breaker)
+    cache.set_many({'first': 1, 'second': 2})
+
+    redis_server.connected = False
+    cache.invalidate('first')
+
+    redis_server.connected = True
+    time.sleep(0.06)
+
+    assert cache.get('first', int) == (None, False)
+    assert cache.get('second', int) == (2, True)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_prefix_invalidations_replayed(redis_server):
+    redis_cache = RedisCache(connection=FakeRedis(server=redis_server))
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    cache = GuardedCache(cache=redis_cache, breaker=breaker)
+    cache.set_many({'func:1': 1, 'func:2': 2, 'other:1': 3})
+
+    redis_server.connected = False
+    assert cache.invalidate_prefix('func:') == 0
+
+    redis_server.connected = True
+    time.sleep(0.06)
+
+    assert cache.get('func:1', int) == (None, False)
+    assert cache.get('func:2', int) == (None, False)
+    assert cache.get('other:1', int) == (3, True)
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_pending_overflow_invalidates_all(redis_server):
+    redis_cache = RedisCache(connection=FakeRedis(server=redis_server))
+    breaker = CircuitBreaker(failure_threshold=1, recovery_timeout=0.05)
+    cache = GuardedCache(
+        cache=redis_cache, breaker=breaker, max_pending_invalidations=2
+    )
+    cache.set_many({'first': 1, 'second': 2, 'third': 3})
+
+    redis_server.connected = False
+    cache.invalidate('first')
+    cache.invalidate('second')
+    cache.invalidate('third')
+
+    redis_server.connected = True
+    time.sleep(0.06)
+
+    # ни одна инвалидация не потеряна: очередь заменена полной очисткой
+    assert cache.get('first', int) == (None, False)
+    assert cache.get('second', int) == (None, False)
+    assert cache.get('third', int) == (None, False)
+
+
+def test_timeout_bounds_latency():
+    slow_cache = SlowCache()
+    slow_cache.delay = 0.5
+    cache = GuardedCache(
+        cache=slow_cache,
+        timeout=0.05,
+        breaker=CircuitBreaker(failure_threshold=1, recovery_timeout=60),
+    )
+    slow_cache.set('test', 1)
+
+    started = time.monotonic()
+    assert cache.get('test', int) == (None, False)
+    assert time.monotonic() - started < 0.4
+
+    # выключатель разомкнут: следующий вызов не ждет вовсе
+    started = time.monotonic()
+    assert cache.get('test', int) == (None, False)
+    assert time.monotonic() - started < 0.01
+
+
+def test_slow_calls_open_breaker():
+    breaker = CircuitBreaker(failure_threshold=2, slow_call_threshold=0.01)
+    slow_cache = SlowCache()
+    slow_cache.delay = 0.02
+    cache = GuardedCache(cache=slow_cache, breaker=breaker)
+
+    cache.get('test', int)
+    cache.get('test', int)
+
+    assert breaker.state == CircuitBreaker.OPEN
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_cached_with_broken_cache(redis_server):
+    redis_cache = RedisCache(connection=FakeRedis(server=redis_server))
+    some_instance = SomeClass(cache=GuardedCache(cache=redis_cache))
+
+    redis_server.connected = False
+
+    assert some_instance.some_method(1, 2) == 3
+    assert some_instance.some_method(1, 2) == 3
+    assert some_instance.calls == 2
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_memory_report_forwards_parameters(redis_server):
+    redis_cache = RedisCache(connection=FakeRedis(server=redis_server))
+    cache = GuardedCache(cache=redis_cache)
+    cache.set_many({f'func:{index}': index for index in range(30)})
+
+    report = cache.memory_report(top=1, sample_size=10, batch_size=10)
+    assert sum(
+        footprint.entries for footprint in report.functions.values()
+    ) == 10
@@ -0,0 +1,101 @@
+try:
+    from fakeredis import FakeRedis
+    redis_installed = True
+except ImportError:
+    FakeRedis = type('FakeRedis', (), {})
+    redis_installed = False
+
+import time
+
+import pytest
+
+from classic.cache import HotKeys
+from classic.cache.caches import RedisCache
+
+pytestmark = pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+
+
+@pytest.fixture(scope='function')
+def hot_keys():
+    hot_keys = HotKeys(threshold=3, sample_rate=1.0, ttl=10)
+    yield hot_keys
+    hot_keys.stop()
+
+
+@pytest.fixture(scope='function')
+def connection():
+    return FakeRedis()
+
+
+@pytest.fixture(scope='function')
+def redis_cache(connection, hot_keys):
+    return RedisCache(connection=connection, hot_keys=hot_keys)
+
+
+def test_hot_key_served_locally(redis_cache, connection, hot_keys):
+    redis_cache.set('hot', 1)
+    redis_cache.set('cold', 2)
+
+    for __ in range(3):
+        assert redis_cache.get('hot', int) == (1, True)
+    redis_cache.get('cold', int)
+
+    # локальная копия не зависит от Redis
+    connection.delete(redis_cache._encode_key('hot'))
+    for __ in range(5):
+        assert redis_cache.get('hot', int) == (1, True)
+    assert redis_cache.get_many({'hot': int, 'cold': int}) == {
+        'hot': (1, True),
+        'cold': (2, True),
+    }
+
+    assert hot_keys.stats() == {redis_cache._encode_key('hot'): 6}
+
+
+def test_write_and_invalidate_drop_local_copy(redis_cache, hot_keys):
+    redis_cache.set('hot', 1)
+    for __ in range(3):
+        redis_cache.get('hot', int)
+
+    redis_cache.set('hot', 2)
+    assert not hot_keys.stats()
+    assert redis_cache.get('hot', int) == (2, True)
+
+    for __ in range(3):
+        redis_cache.get('hot', int)
+    redis_cache.invalidate('hot')
+    assert redis_cache.get('hot', int) == (None, False)
+
+
+def test_background_refresh(connection):
+    hot_keys = HotKeys(threshold=3, sample_rate=1.0, ttl=0.1)
+    redis_cache = RedisCache(connection=connection, hot_keys=hot_keys)
+    other_node = RedisCache(connection=connection)
+    redis_cache.set('hot', 1)
+    for __ in range(3):
+        redis_cache.get('hot', int)
+
+    other_node.set('hot', 2)
+    deadline = time.monotonic() + 1
+    while redis_cache.get('hot', int) != (2, True):
+        assert time.monotonic() < deadline
+        time.sleep(0.01)
+
+    # без обращений ключ перестает быть горячим
+    time.sleep(0.3)
+    assert not hot_keys.stats()
+    hot_keys.stop()
+
+
+def test_capacity(connection):
+    hot_keys = HotKeys(threshold=1, sample_rate=1.0, capacity=2)
+    redis_cache = RedisCache(connection=connection, hot_keys=hot_keys)
+    redis_cache.set_many({f'key_{index}': index for index in range(5)})
+
+    for index in range(5):
+        redis_cache.get(f'key_{index}', int)
+
+    assert len(hot_keys.stats()) == 2
+    hot_keys.stop()
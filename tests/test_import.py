@@ -0,0 +1,72 @@
+import logging
+import subprocess
+import sys
+
+import pytest
+
+logger = logging.getLogger(__name__)
+
+OPTIONAL_MODULES = ('redis', 'orjson', 'fakeredis')
+
+
+def run_python(code: str) -> str:
+    return subprocess.run(
+        [sys.executable, '-c', code],
+        check=True,
+        capture_output=True,
+        text=True,
+    ).stdout.strip()
+
+
+def loaded_modules(code: str) -> set[str]:
+    output = run_python(
+        f'import sys\n{code}\n'
+        f'print(",".join(m for m in {OPTIONAL_MODULES!r} if m in sys.modules))'
+    )
+    return set(filter(None, output.split(',')))
+
+
+@pytest.mark.parametrize(
+    'code', [
+        'import classic.cache',
+        'from classic.cache import cached, Cache',
+        (
+            'from classic.cache.caches import InMemoryCache\n'
+            'InMemoryCache().set("key", 1)'
+        ),
+    ]
+)
+def test_optional_dependencies_not_imported(code):
+    assert not loaded_modules(code)
+
+
+def test_optional_dependencies_imported_on_access():
+    assert 'redis' in loaded_modules(
+        'from classic.cache.caches import RedisCache'
+    )
+    assert 'orjson' in loaded_modules(
+        'from classic.cache import key_generators\nkey_generators.OrJson'
+    )
+
+
+def test_lazy_attributes():
+    import classic.cache
+    from classic.cache import caches, key_generators
+
+    assert classic.cache.caches is caches
+    assert {'RedisCache', 'InMemoryCache'} <= set(dir(caches))
+    assert key_generators.MsgSpec.__name__ == 'MsgSpec'
+
+    with pytest.raises(AttributeError):
+        caches.Missing
+
+
+def test_import_time():
+    elapsed = float(run_python(
+        'import time\n'
+        'started = time.perf_counter()\n'
+        'import classic.cache\n'
+        'print(time.perf_counter() - started)'
+    ))
+
+    logger.info(f'Import time for classic.cache: {elapsed:.3f} seconds')
@@ -141,3 +141,43 @@ def test_key_generator_performance(generator):
             f"seconds for {num_trials} trials"
         )
     )
+
+
+@pytest.mark.parametrize('digest_size', [8, 16])
+def test_compact_fixed_length(digest_size):
+    generator = key_generators.Compact(digest_size=digest_size)
+    prefix = generator.prefix(args_function).encode()
+
+    key_a = generator(args_function, 0, 1)
+    key_b = generator(args_function, 10 ** 6, list(range(1000)))
+
+    assert isinstance(key_a, bytes)
+    assert key_a.startswith(prefix) and key_b.startswith(prefix)
+    assert len(key_a) == len(key_b) == len(prefix) + 1 + digest_size
+    assert key_a != key_b
+
+
+def test_compact_empty_args():
+    generator = key_generators.Compact()
+
+    assert generator(empty_args_function) == (
+        generator.prefix(empty_args_function).encode()
+    )
+
+
+def test_compact_kwargs_order():
+    generator = key_generators.Compact()
+
+    key_a = generator(kwargs_function, a=1, b=2)
+    key_b = generator(kwargs_function, b=2, a=1)
+    key_c = generator(kwargs_function, 'a', 1, 'b', 2)
+
+    assert key_a == key_b and key_a != key_c
+
+
+def test_compact_scopes():
+    generator = key_generators.Compact()
+
+    assert generator(A().args_function, 0, 1) != generator(
+        B().args_function, 0, 1
+    )
@@ -0,0 +1,119 @@
+try:
+    from fakeredis import FakeRedis
+    redis_installed = True
+except ImportError:
+    FakeRedis = type('FakeRedis', (), {})
+    redis_installed = False
+
+import io
+
+import pytest
+
+from classic.cache import cached
+from classic.cache.caches import InMemoryCache, LRU, RedisCache, WTinyLFU
+from classic.cache.decorator import BoundedWrapper
+from classic.cache import simulator
+from classic.components import component
+
+
+@component
+class SomeClass:
+
+    @cached(ttl=60)
+    def some_method(self, arg1: int, arg2: int) -> int:
+        return arg1 + arg2
+
+
+@pytest.fixture(scope='function')
+def recorder():
+    recorder = simulator.TraceRecorder(io.BytesIO())
+    BoundedWrapper.recorder = recorder
+    yield recorder
+    BoundedWrapper.recorder = None
+
+
+def test_zipf_trace_skewed():
+    trace = simulator.zipf_trace(keys=1000, length=10000, seed=1)
+
+    assert len(trace) == 10000
+    assert all(0 <= key < 1000 for key in trace)
+    assert trace.count(0) > trace.count(999) * 10
+
+
+def test_scan_and_burst_traces():
+    assert simulator.scan_trace(3, 7) == [0, 1, 2, 0, 1, 2, 0]
+
+    trace = simulator.burst_trace(
+        keys=100, length=3000, burst_keys=5, burst_length=500, period=1000,
+        seed=1,
+    )
+    assert set(trace[1000:1500]) <= set(range(100, 105))
+    assert set(trace[2000:2500]) <= set(range(105, 110))
+
+
+@pytest.mark.parametrize('use_decorator', [True, False])
+def test_simulate_in_memory(use_decorator):
+    trace = simulator.scan_trace(10, 100)
+
+    report = simulator.simulate(
+        InMemoryCache(), trace, use_decorator=use_decorator
+    )
+
+    assert report.requests == 100 and report.hits == 90
+    assert report.hit_ratio == 0.9
+    assert report.operations['get'] == 100
+    assert report.operations['set'] == 10
+    assert report.memory > 0
+    assert report.latency['p50'] <= report.latency['p99']
+
+
+@pytest.mark.skipif(
+    not redis_installed, reason='redis package is not installed'
+)
+def test_simulate_redis():
+    trace = simulator.zipf_trace(keys=100, length=1000, seed=1)
+
+    reports = simulator.compare(
+        {
+            'memory': InMemoryCache(),
+            'redis': RedisCache(connection=FakeRedis()),
+        },
+        trace,
+    )
+
+    assert reports[0].hits == reports[1].hits
+    assert 'redis' in simulator.format_reports(reports)
+
+
+def test_compare_eviction_policies():
+    trace = simulator.mix_traces(
+        simulator.zipf_trace(keys=2000, length=10000, seed=1),
+        simulator.scan_trace(5000, 5000, start=10000),
+        simulator.zipf_trace(keys=2000, length=10000, seed=2),
+    )
+
+    lru, tinylfu = simulator.compare(
+        {
+            'lru': InMemoryCache(eviction=LRU(100)),
+            'tinylfu': InMemoryCache(eviction=WTinyLFU(100)),
+        },
+        trace,
+    )
+
+    assert tinylfu.hit_ratio > lru.hit_ratio
+
+
+def test_record_and_replay(recorder):
+    some_instance = SomeClass(cache=InMemoryCache())
+
+    for arg in [1, 2, 1, 1, 3]:
+        some_instance.some_method(arg, 0)
+
+    recorder.file.seek(0)
+    trace = simulator.load_trace(recorder.file)
+
+    assert len(trace) == 5
+    assert trace[0] == trace[2] == trace[3] != trace[1]
+
+    report = simulator.simulate(InMemoryCache(), trace)
+    assert report.hits == 2